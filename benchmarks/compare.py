@@ -0,0 +1,80 @@
+"""Compare two benchmarks.load reports and flag regressions.
+
+Exits with status 1 when any endpoint's p95 grew, or its throughput
+fell, by more than `--threshold` (a fraction) between the two runs:
+
+    python -m benchmarks.compare main.json head.json --threshold 0.1
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def change(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before
+
+
+def compare(base, head, threshold):
+    """Yield (mix, endpoint, metric, before, after, change, regressed)."""
+    for mix, endpoints in head['results'].items():
+        for endpoint, stats in endpoints.items():
+            before = base['results'].get(mix, {}).get(endpoint)
+            if before is None:
+                continue
+
+            for metric in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+                delta = change(before[metric], stats[metric])
+                if delta is None:
+                    continue
+
+                # Throughput regresses downwards, latency upwards
+                worse = -delta if metric == 'rps' else delta
+                regressed = metric in {'rps', 'p95_ms'} and worse > threshold
+                yield (
+                    mix,
+                    endpoint,
+                    metric,
+                    before[metric],
+                    stats[metric],
+                    delta,
+                    regressed,
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    print(f'base {base["meta"]["revision"]}  head {head["meta"]["revision"]}')
+    print(
+        f'{"mix":<8}{"endpoint":<26}{"metric":<8}'
+        f'{"base":>10}{"head":>10}{"change":>9}'
+    )
+
+    regressions = 0
+    for row in compare(base, head, args.threshold):
+        mix, endpoint, metric, before, after, delta, regressed = row
+        regressions += regressed
+        print(
+            f'{mix:<8}{endpoint:<26}{metric:<8}{before:>10.2f}'
+            f'{after:>10.2f}{delta:>+9.1%}'
+            + ('  REGRESSION' if regressed else '')
+        )
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
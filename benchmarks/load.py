@@ -0,0 +1,291 @@
+"""Drive the API with concurrent virtual users and report latencies.
+
+Each mix runs `--concurrency` virtual users, logged in as users created
+by benchmarks.seed, for `--duration` seconds after a warm-up. Requests
+go to the ASGI app in-process, or to a running server with `--url`.
+Results are printed as a table and written as JSON for
+benchmarks.compare:
+
+    python -m benchmarks.seed --users 10000 --todos 10000000
+    python -m benchmarks.load --mixes list create patch delete login mixed \\
+        --concurrency 32 --duration 30 --output head.json
+
+In-process runs switch off the login rate limiter; a server under
+`--url` needs limits high enough for the login mix.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+
+from httpx import ASGITransport, AsyncClient
+
+from benchmarks.common import git_revision, summarize
+from benchmarks.seed import PASSWORD, bench_email
+
+# Operation weights of each mix
+MIXES = {
+    'login': {'login': 1},
+    'list': {'list': 1},
+    'create': {'create': 1},
+    'patch': {'patch': 1},
+    'delete': {'delete': 1},
+    'mixed': {'list': 60, 'create': 15, 'patch': 15, 'delete': 5, 'login': 5},
+}
+STATES = ['draft', 'todo', 'doing', 'done', 'trash']
+STOCK_SIZE = 50
+SETUP_LOGIN_ATTEMPTS = 5
+
+
+class Recorder:
+    """Latency samples per endpoint, kept only after the warm-up."""
+
+    def __init__(self):
+        self.measuring = False
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, label, request, *args, **kwargs):
+        start = time.perf_counter()
+        response = await request(*args, **kwargs)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if self.measuring:
+            self.samples[label].append(elapsed_ms)
+            if response.is_error:
+                self.errors[label] += 1
+        return response
+
+
+class VirtualUser:
+    def __init__(self, client, recorder, email, rng):
+        self.client = client
+        self.recorder = recorder
+        self.email = email
+        self.rng = rng
+        self.headers = {}
+        self.todo_ids = []
+        self.stock = []
+
+    async def login(self):
+        response = await self.recorder.call(
+            'POST /auth/token',
+            self.client.post,
+            '/auth/token',
+            data={'username': self.email, 'password': PASSWORD},
+        )
+        # Refusals (429, 503) are counted by the recorder; keep the token
+        if response.is_error:
+            return False
+
+        token = response.json()['access_token']
+        self.headers = {'Authorization': f'Bearer {token}'}
+        return True
+
+    async def list(self):
+        params = {'limit': 20}
+        if self.rng.random() < 0.3:  # noqa: PLR2004
+            params['state'] = self.rng.choice(STATES)
+        await self.recorder.call(
+            'GET /todos/',
+            self.client.get,
+            '/todos/',
+            params=params,
+            headers=self.headers,
+        )
+
+    async def create(self):
+        response = await self.recorder.call(
+            'POST /todos/',
+            self.client.post,
+            '/todos/',
+            json=self._new_todo(),
+            headers=self.headers,
+        )
+        if not response.is_error:
+            self.todo_ids.append(response.json()['id'])
+
+    async def patch(self):
+        if not self.todo_ids:
+            return
+        await self.recorder.call(
+            'PATCH /todos/{todo_id}',
+            self.client.patch,
+            f'/todos/{self.rng.choice(self.todo_ids)}',
+            json={'state': self.rng.choice(STATES)},
+            headers=self.headers,
+        )
+
+    async def delete(self):
+        if not self.stock:
+            await self.restock()
+        if not self.stock:
+            return
+        await self.recorder.call(
+            'DELETE /todos/{todo_id}',
+            self.client.delete,
+            f'/todos/{self.stock.pop()}',
+            headers=self.headers,
+        )
+
+    async def restock(self):
+        """Create todos for the delete mix to consume, measured apart."""
+        response = await self.recorder.call(
+            'POST /todos/batch',
+            self.client.post,
+            '/todos/batch',
+            json=[self._new_todo() for _ in range(STOCK_SIZE)],
+            headers=self.headers,
+        )
+        if not response.is_error:
+            self.stock.extend(todo['id'] for todo in response.json())
+
+    async def setup(self):
+        # Every virtual user logs in at once, which the login limits and
+        # the Argon2 backlog may refuse for a moment
+        for _ in range(SETUP_LOGIN_ATTEMPTS):
+            if await self.login():
+                break
+            await asyncio.sleep(1)
+        else:
+            sys.exit(f'Could not log in as {self.email}')
+
+        await self.restock()
+        self.todo_ids = self.stock[: STOCK_SIZE // 2]
+        self.stock = self.stock[STOCK_SIZE // 2 :]
+
+    def _new_todo(self):
+        return {
+            'title': f'load {self.rng.getrandbits(32):08x}',
+            'description': 'created by benchmarks.load',
+            'state': self.rng.choice(STATES),
+        }
+
+
+async def run_mix(client, mix, args, rng):
+    operations = list(MIXES[mix])
+    weights = list(MIXES[mix].values())
+    recorder = Recorder()
+    emails = [
+        bench_email(rng.randint(1, args.users))
+        for _ in range(args.concurrency)
+    ]
+    users = [
+        VirtualUser(client, recorder, email, random.Random(rng.random()))
+        for email in emails
+    ]
+    await asyncio.gather(*(user.setup() for user in users))
+
+    async def drive(user, until):
+        while time.perf_counter() < until:
+            operation = user.rng.choices(operations, weights)[0]
+            await getattr(user, operation)()
+
+    await asyncio.gather(
+        *(drive(user, time.perf_counter() + args.warmup) for user in users)
+    )
+    recorder.measuring = True
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(drive(user, start + args.duration) for user in users)
+    )
+    elapsed = time.perf_counter() - start
+
+    return {
+        label: {
+            'requests': len(samples),
+            'errors': recorder.errors[label],
+            'rps': len(samples) / elapsed,
+            **summarize(samples),
+        }
+        for label, samples in sorted(recorder.samples.items())
+    }
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    results = {}
+    async with AsyncExitStack() as stack:
+        if args.url:
+            client = AsyncClient(base_url=args.url, timeout=60)
+        else:
+            from fast_zero.app import app  # noqa: PLC0415
+            from fast_zero.rate_limit import login_limiter  # noqa: PLC0415
+
+            login_limiter.enabled = False
+            # Run the app's startup and shutdown as a server would
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = ASGITransport(app=app)
+            client = AsyncClient(transport=transport, base_url='http://bench')
+
+        await stack.enter_async_context(client)
+        for mix in args.mixes:
+            results[mix] = await run_mix(client, mix, args, rng)
+            print_mix(mix, results[mix])
+
+    return results
+
+
+def print_mix(mix, endpoints):
+    print(f'\n[{mix}]', file=sys.stderr)
+    print(
+        f'{"endpoint":<26}{"rps":>9}{"p50 ms":>9}{"p95 ms":>9}'
+        f'{"p99 ms":>9}{"errors":>8}',
+        file=sys.stderr,
+    )
+    for label, stats in endpoints.items():
+        print(
+            f'{label:<26}{stats["rps"]:>9.1f}{stats["p50_ms"]:>9.2f}'
+            f'{stats["p95_ms"]:>9.2f}{stats["p99_ms"]:>9.2f}'
+            f'{stats["errors"]:>8}',
+            file=sys.stderr,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--mixes', nargs='+', choices=MIXES, default=list(MIXES)
+    )
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument(
+        '--users', type=int, default=10_000, help='users seeded'
+    )
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--url', help='target server; default in-process')
+    parser.add_argument('--output', help='write JSON results here')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'target': args.url or 'in-process',
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'seed': args.seed,
+        },
+        'results': asyncio.run(run(args)),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Latency of an unrelated endpoint while a burst of logins is running.
+
+Drives the ASGI app in-process against the database configured in
+Settings (e.g. the compose Postgres) and prints p50/p99 of `GET /` while
+`--logins` concurrent `/auth/token` calls are in flight, once per hashing
+executor:
+
+    python -m benchmarks.login_storm --logins 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from httpx import ASGITransport, AsyncClient
+
+from benchmarks.common import percentile
+from fast_zero import security
+from fast_zero.app import app
+from fast_zero.rate_limit import login_limiter
+from fast_zero.security import PasswordHasher, settings
+
+PASSWORD = 'storm_password'
+
+
+async def create_user(client):
+    name = f'storm_{uuid.uuid4().hex[:8]}'
+    response = await client.post(
+        '/users/',
+        json={
+            'username': name,
+            'email': f'{name}@bench.com',
+            'password': PASSWORD,
+        },
+    )
+    response.raise_for_status()
+    return response.json()['email']
+
+
+async def login_storm(client, email, logins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            await client.post(
+                '/auth/token', data={'username': email, 'password': PASSWORD}
+            )
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def probe(client, stop, samples, interval):
+    # Latency is measured from the time each probe was *due*, so stalls
+    # of the event loop count against it (no coordinated omission).
+    due = time.perf_counter()
+    while not stop.is_set():
+        await client.get('/')
+        samples.append((time.perf_counter() - due) * 1000)
+        due += interval
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+
+async def run(executor, logins, concurrency, interval):
+    security.password_hasher = PasswordHasher(
+        executor=executor,
+        workers=settings.PASSWORD_HASH_WORKERS,
+        max_pending=max(logins, settings.PASSWORD_HASH_MAX_PENDING),
+    )
+    # One user logging in hundreds of times is the point here
+    login_limiter.enabled = False
+    transport = ASGITransport(app=app)
+    async with (
+        app.router.lifespan_context(app),
+        AsyncClient(transport=transport, base_url='http://b') as client,
+    ):
+        email = await create_user(client)
+
+        samples, stop = [], asyncio.Event()
+        prober = asyncio.create_task(probe(client, stop, samples, interval))
+        start = time.perf_counter()
+        await login_storm(client, email, logins, concurrency)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    return {
+        'executor': executor,
+        'logins_per_s': logins / elapsed,
+        'probe_p50_ms': statistics.median(samples),
+        'probe_p99_ms': percentile(samples, 0.99),
+        'probes': len(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument(
+        '--interval', type=float, default=0.01, help='seconds between probes'
+    )
+    parser.add_argument(
+        '--executors', nargs='+', default=['inline', 'thread', 'process']
+    )
+    args = parser.parse_args()
+
+    print(
+        f'{"executor":<10}{"logins/s":>10}{"p50 ms":>10}'
+        f'{"p99 ms":>10}{"probes":>8}'
+    )
+    for executor in args.executors:
+        result = asyncio.run(
+            run(executor, args.logins, args.concurrency, args.interval)
+        )
+        print(
+            f'{result["executor"]:<10}{result["logins_per_s"]:>10.1f}'
+            f'{result["probe_p50_ms"]:>10.2f}{result["probe_p99_ms"]:>10.2f}'
+            f'{result["probes"]:>8}'
+        )
+
+
+if __name__ == '__main__':
+    main()
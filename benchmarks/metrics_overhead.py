@@ -0,0 +1,73 @@
+"""Per-request cost of recording route metrics.
+
+Serves a database-free route in-process through a plain APIRoute and
+through InstrumentedRoute, and times the recording primitives:
+
+    python -m benchmarks.metrics_overhead --requests 5000
+"""
+
+import argparse
+import asyncio
+import time
+import timeit
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from httpx import ASGITransport, AsyncClient
+
+from fast_zero.metrics import Histogram, InstrumentedRoute, registry
+
+
+def build_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+    app.router.route_class = InstrumentedRoute if with_metrics else APIRoute
+
+    @app.get('/')
+    async def read_root():
+        return {'message': 'ok'}
+
+    return app
+
+
+async def time_requests(app, requests: int) -> float:
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url='http://t') as c:
+        for _ in range(100):
+            await c.get('/')
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            await c.get('/')
+        return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    # Interleave runs so drift in machine load hits both variants alike
+    results = {False: [], True: []}
+    for _ in range(3):
+        for with_metrics, timings in results.items():
+            app = build_app(with_metrics)
+            timings.append(asyncio.run(time_requests(app, args.requests)))
+
+    bare, instrumented = min(results[False]), min(results[True])
+    overhead = instrumented - bare
+    print(f'without metrics  {bare * 1e6:8.1f} us/request')
+    print(f'with metrics     {instrumented * 1e6:8.1f} us/request')
+    print(f'overhead         {overhead * 1e6:8.1f} us ({overhead / bare:.1%})')
+
+    histogram = Histogram('bench_seconds', 'Benchmark.', ('route',))
+    primitives = {
+        'histogram observe': (lambda: histogram.observe(0.01, '/'), 100_000),
+        'render /metrics': (registry.render, 1000),
+    }
+    for name, (func, loops) in primitives.items():
+        seconds = min(timeit.repeat(func, number=loops, repeat=3)) / loops
+        print(f'{name:<17}{seconds * 1e6:8.2f} us')
+
+
+if __name__ == '__main__':
+    main()
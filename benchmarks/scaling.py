@@ -0,0 +1,162 @@
+"""Throughput of the production server as workers are added.
+
+Starts `python -m fast_zero.server` with each `--workers` count in turn
+and drives it with benchmarks.load, split over `--drivers` processes so
+the load generator is not the bottleneck. Needs users from
+benchmarks.seed. The generator shares the machine with the server, so
+leave it cores of its own (e.g. pin the server with taskset) for clean
+numbers:
+
+    python -m benchmarks.scaling --workers 1 2 4 8 --mix list
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import git_revision
+from fast_zero.server import available_cores
+
+
+def wait_until_up(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f'Server exited with status {process.returncode}')
+        try:
+            httpx.get(url, timeout=1).raise_for_status()
+            return
+
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    sys.exit(f'Server did not answer at {url} within {timeout}s')
+
+
+def drive(url, args, workdir):
+    """Run the load drivers against `url`; return summed rps and p95."""
+    outputs = [Path(workdir, f'driver{n}.json') for n in range(args.drivers)]
+    drivers = [
+        subprocess.Popen([
+            sys.executable,
+            '-m',
+            'benchmarks.load',
+            '--url',
+            url,
+            '--mixes',
+            args.mix,
+            '--concurrency',
+            str(args.concurrency // args.drivers),
+            '--duration',
+            str(args.duration),
+            '--warmup',
+            str(args.warmup),
+            '--users',
+            str(args.users),
+            '--seed',
+            str(n),
+            '--output',
+            str(output),
+        ])
+        for n, output in enumerate(outputs)
+    ]
+    for driver in drivers:
+        if driver.wait():
+            sys.exit('A load driver failed')
+
+    rps, p95 = 0.0, 0.0
+    for output in outputs:
+        endpoints = json.loads(output.read_text())['results'][args.mix]
+        rps += sum(stats['rps'] for stats in endpoints.values())
+        p95 = max(p95, *(stats['p95_ms'] for stats in endpoints.values()))
+    return rps, p95
+
+
+def measure(workers, args, workdir):
+    env = {
+        **os.environ,
+        # Every driver logs in from the same address
+        'LOGIN_RATE_LIMIT_PER_ADDRESS': str(10 * args.concurrency),
+    }
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            '-m',
+            'fast_zero.server',
+            '--port',
+            str(args.port),
+            '--workers',
+            str(workers),
+        ],
+        env=env,
+    )
+    url = f'http://127.0.0.1:{args.port}'
+    try:
+        wait_until_up(url + '/', server)
+        return drive(url, args, workdir)
+
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    cores = available_cores()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--workers',
+        type=int,
+        nargs='+',
+        default=sorted({1, max(1, cores // 2), cores}),
+    )
+    parser.add_argument('--mix', default='list')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--drivers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--output', help='write JSON results here')
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for workers in args.workers:
+            rps, p95 = measure(workers, args, workdir)
+            rows.append({'workers': workers, 'rps': rps, 'p95_ms': p95})
+
+    base = rows[0]['rps'] / rows[0]['workers']
+    print(
+        f'{"workers":>8}{"rps":>10}{"speedup":>9}'
+        f'{"efficiency":>12}{"p95 ms":>9}'
+    )
+    for row in rows:
+        speedup = row['rps'] / rows[0]['rps']
+        efficiency = row['rps'] / (base * row['workers'])
+        print(
+            f'{row["workers"]:>8}{row["rps"]:>10.1f}{speedup:>8.2f}x'
+            f'{efficiency:>12.0%}{row["p95_ms"]:>9.2f}'
+        )
+
+    if args.output:
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'cores': cores,
+                'mix': args.mix,
+                'concurrency': args.concurrency,
+            },
+            'results': rows,
+        }
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(report, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Seed the configured database with a realistic, reproducible dataset.
+
+Creates `--users` users sharing one password and `--todos` todos whose
+owners follow a power law, so a few accounts hold most of the todos as
+in production. The same `--seed` always produces the same data:
+
+    python -m benchmarks.seed --users 10000 --todos 10000000
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from fast_zero import database
+from fast_zero.security import get_password_harsh
+
+PASSWORD = 'bench_password'
+USER_PREFIX = 'bench_'
+
+
+def bench_email(number: int) -> str:
+    return f'{USER_PREFIX}{number}@bench.com'
+
+
+async def reset(conn):
+    await conn.execute(text('TRUNCATE users, todos RESTART IDENTITY CASCADE'))
+
+
+async def seed_users(conn, users: int):
+    await conn.execute(
+        text(
+            'INSERT INTO users (username, email, password) '
+            "SELECT :prefix || g, :prefix || g || '@bench.com', :password "
+            'FROM generate_series(1, CAST(:users AS int)) AS g'
+        ),
+        {
+            'prefix': USER_PREFIX,
+            'password': get_password_harsh(PASSWORD),
+            'users': users,
+        },
+    )
+
+
+async def seed_todos(conn, start: int, count: int, skew: float):
+    # random()^skew piles owners up at the low user ids
+    await conn.execute(
+        text(
+            'INSERT INTO todos (title, description, user_id, state) '
+            "SELECT 'todo ' || g, 'seeded description ' || g, "
+            'u.first_id + floor('
+            '  u.total * power(random(), CAST(:skew AS float8))'
+            ')::int, '
+            "(ARRAY['draft', 'todo', 'doing', 'done', 'trash'])"
+            '[1 + floor(random() * 5)::int]::todostate '
+            'FROM generate_series('
+            '  CAST(:start AS int), CAST(:stop AS int)'
+            ') AS g, '
+            '(SELECT min(id) AS first_id, count(*) AS total FROM users '
+            ' WHERE email LIKE :pattern) AS u'
+        ),
+        {
+            'skew': skew,
+            'start': start,
+            'stop': start + count - 1,
+            'pattern': f'{USER_PREFIX}%@bench.com',
+        },
+    )
+
+
+async def seed(args):
+    await database.open_engines()
+    async with database.engine.connect() as conn:
+        await conn.execute(text('SET synchronous_commit = off'))
+        await conn.execute(text('SELECT setseed(:seed)'), {'seed': args.seed})
+
+        if args.reset:
+            await reset(conn)
+        await seed_users(conn, args.users)
+        await conn.commit()
+
+        start = time.perf_counter()
+        for offset in range(0, args.todos, args.batch):
+            count = min(args.batch, args.todos - offset)
+            await seed_todos(conn, offset + 1, count, args.skew)
+            await conn.commit()
+            done = offset + count
+            rate = done / (time.perf_counter() - start)
+            print(f'{done:>12,} todos  {rate:>10,.0f} rows/s', flush=True)
+
+        await conn.execute(text('ANALYZE users, todos'))
+        await conn.commit()
+
+    await database.close_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--todos', type=int, default=10_000_000)
+    parser.add_argument(
+        '--skew', type=float, default=3.0, help='1 spreads todos evenly'
+    )
+    parser.add_argument('--batch', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=float, default=0.42)
+    parser.add_argument(
+        '--reset', action='store_true', help='empty users and todos first'
+    )
+    asyncio.run(seed(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Per-item cost of serializing a page of todos.
+
+Compares the response_model path FastAPI takes for ORM objects
+(validate with from_attributes, dump to Python, stdlib json) with the
+precompiled TypeAdapter encoding column rows straight to bytes:
+
+    python -m benchmarks.serialization --items 100 --repeat 2000
+"""
+
+import argparse
+import json
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from fast_zero.db_models import ToDo, TodoState
+from fast_zero.schemas import TodosList
+from fast_zero.serialization import todos_page
+
+response_model = TypeAdapter(TodosList)
+
+
+def make_rows(items):
+    return [
+        {
+            'id': index,
+            'title': f'title {index}',
+            'description': f'description of todo number {index}',
+            'state': list(TodoState)[index % len(TodoState)],
+        }
+        for index in range(items)
+    ]
+
+
+def make_objects(rows):
+    objects = []
+    for row in rows:
+        todo = ToDo(
+            title=row['title'],
+            description=row['description'],
+            user_id=1,
+            state=row['state'],
+        )
+        todo.id = row['id']
+        objects.append(todo)
+    return objects
+
+
+def response_model_path(objects):
+    page = response_model.validate_python(
+        {'todos': objects, 'next_cursor': None}, from_attributes=True
+    )
+    content = jsonable_encoder(response_model.dump_python(page, mode='json'))
+    return json.dumps(content, separators=(',', ':')).encode()
+
+
+def fast_path(rows):
+    return todos_page.dump_json({'todos': rows, 'next_cursor': None})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.items)
+    objects = make_objects(rows)
+
+    print(f'{"path":<16}{"per page (us)":>16}{"per item (us)":>16}')
+    for name, func, data in [
+        ('response_model', response_model_path, objects),
+        ('type_adapter', fast_path, rows),
+    ]:
+        seconds = min(
+            timeit.repeat(lambda: func(data), number=args.repeat, repeat=5)
+        )
+        per_page = seconds / args.repeat * 1e6
+        print(f'{name:<16}{per_page:>16.1f}{per_page / args.items:>16.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,4 +2,5 @@
 
 poetry run alembic upgrade head
 
-poetry run uvicorn --host 0.0.0.0 --port 8000 fast_zero.app:app
\ No newline at end of file
+# exec, so SIGTERM reaches the server and it shuts down gracefully
+exec poetry run python -m fast_zero.server --host 0.0.0.0 --port 8000
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""add todo counts
+
+Revision ID: 110dab652f4a
+Revises: 3a84eedef0f0
+Create Date: 2026-10-18 09:41:27.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '110dab652f4a'
+down_revision: Union[str, Sequence[str], None] = '3a84eedef0f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = {
+    'todos_count_on_insert': (
+        'INSERT', 'REFERENCING NEW TABLE AS new_todos'
+    ),
+    'todos_count_on_update': (
+        'UPDATE', 'REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos'
+    ),
+    'todos_count_on_delete': (
+        'DELETE', 'REFERENCING OLD TABLE AS old_todos'
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'todo_counts',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column(
+            'state',
+            postgresql.ENUM(name='todostate', create_type=False),
+            nullable=False,
+        ),
+        sa.Column(
+            'count', sa.BigInteger(), server_default='0', nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ['user_id'], ['users.id'], ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('user_id', 'state'),
+    )
+    op.execute('''
+        CREATE OR REPLACE FUNCTION apply_todo_count_deltas()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO todo_counts AS c (user_id, state, count)
+                SELECT d.user_id, d.state, count(*)
+                FROM new_todos AS d JOIN users AS u ON u.id = d.user_id
+                GROUP BY d.user_id, d.state
+                ON CONFLICT (user_id, state)
+                DO UPDATE SET count = c.count + EXCLUDED.count;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO todo_counts AS c (user_id, state, count)
+                SELECT d.user_id, d.state, -count(*)
+                FROM old_todos AS d JOIN users AS u ON u.id = d.user_id
+                GROUP BY d.user_id, d.state
+                ON CONFLICT (user_id, state)
+                DO UPDATE SET count = c.count + EXCLUDED.count;
+            ELSE
+                INSERT INTO todo_counts AS c (user_id, state, count)
+                SELECT d.user_id, d.state, sum(d.delta)
+                FROM (
+                    SELECT user_id, state, 1 AS delta FROM new_todos
+                    UNION ALL SELECT user_id, state, -1 FROM old_todos
+                ) AS d JOIN users AS u ON u.id = d.user_id
+                GROUP BY d.user_id, d.state
+                HAVING sum(d.delta) <> 0
+                ON CONFLICT (user_id, state)
+                DO UPDATE SET count = c.count + EXCLUDED.count;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    ''')
+    for name, (operation, referencing) in TRIGGERS.items():
+        op.execute(
+            f'CREATE TRIGGER {name} AFTER {operation} ON todos '
+            f'{referencing} FOR EACH STATEMENT '
+            'EXECUTE FUNCTION apply_todo_count_deltas()'
+        )
+    op.execute('''
+        INSERT INTO todo_counts (user_id, state, count)
+        SELECT user_id, state, count(*) FROM todos GROUP BY user_id, state
+    ''')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER {name} ON todos')
+    op.execute('DROP FUNCTION apply_todo_count_deltas()')
+    op.drop_table('todo_counts')
@@ -0,0 +1,76 @@
+"""add users change version
+
+Revision ID: 3a84eedef0f0
+Revises: 77914e5086a2
+Create Date: 2026-10-18 07:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a84eedef0f0'
+down_revision: Union[str, Sequence[str], None] = '77914e5086a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = {
+    'todos_bump_versions_on_insert': (
+        'INSERT', 'REFERENCING NEW TABLE AS new_todos'
+    ),
+    'todos_bump_versions_on_update': (
+        'UPDATE', 'REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos'
+    ),
+    'todos_bump_versions_on_delete': (
+        'DELETE', 'REFERENCING OLD TABLE AS old_todos'
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'users',
+        sa.Column(
+            'change_version', sa.BigInteger(), server_default='0',
+            nullable=False,
+        ),
+    )
+    op.execute('''
+        CREATE OR REPLACE FUNCTION bump_todo_owner_versions()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE users SET change_version = change_version + 1
+                WHERE id IN (SELECT user_id FROM new_todos);
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE users SET change_version = change_version + 1
+                WHERE id IN (SELECT user_id FROM old_todos);
+            ELSE
+                UPDATE users SET change_version = change_version + 1
+                WHERE id IN (
+                    SELECT user_id FROM new_todos
+                    UNION SELECT user_id FROM old_todos
+                );
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    ''')
+    for name, (operation, referencing) in TRIGGERS.items():
+        op.execute(
+            f'CREATE TRIGGER {name} AFTER {operation} ON todos '
+            f'{referencing} FOR EACH STATEMENT '
+            'EXECUTE FUNCTION bump_todo_owner_versions()'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER {name} ON todos')
+    op.execute('DROP FUNCTION bump_todo_owner_versions()')
+    op.drop_column('users', 'change_version')
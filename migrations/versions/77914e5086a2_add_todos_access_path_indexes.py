@@ -0,0 +1,43 @@
+"""add todos access path indexes
+
+Revision ID: 77914e5086a2
+Revises: aa40f34d2b88
+Create Date: 2026-10-18 05:37:52.755501
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '77914e5086a2'
+down_revision: Union[str, Sequence[str], None] = 'aa40f34d2b88'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    'ix_todos_user_id_id': ['user_id', 'id'],
+    'ix_todos_user_id_state_id': ['user_id', 'state', 'id'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction, but it keeps writes to
+    # todos flowing while the indexes are built.
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(
+                name, 'todos', columns, postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(
+                name, table_name='todos', postgresql_concurrently=True
+            )
@@ -0,0 +1,53 @@
+"""add refresh tokens
+
+Revision ID: 9f6c95322485
+Revises: 5c7e2d91b04f
+Create Date: 2026-10-18 12:30:14.827301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f6c95322485'
+down_revision: Union[str, Sequence[str], None] = '5c7e2d91b04f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'refresh_tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('digest', sa.LargeBinary(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.Uuid(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column(
+            'created_at', sa.DateTime(), server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.Column('rotated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ['user_id'], ['users.id'], ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('digest'),
+    )
+    op.create_index(
+        'ix_refresh_tokens_user_id', 'refresh_tokens', ['user_id']
+    )
+    op.create_index(
+        'ix_refresh_tokens_family_id', 'refresh_tokens', ['family_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_tokens_family_id', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_user_id', table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
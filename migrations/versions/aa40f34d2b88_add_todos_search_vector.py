@@ -0,0 +1,55 @@
+"""add todos search vector
+
+Revision ID: aa40f34d2b88
+Revises: c274326c1b11
+Create Date: 2026-10-18 05:37:25.609654
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'aa40f34d2b88'
+down_revision: Union[str, Sequence[str], None] = 'c274326c1b11'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A stored generated column is filled by rewriting todos, which holds
+    # an ACCESS EXCLUSIVE lock until done: on a large table, run this in
+    # a maintenance window.
+    op.add_column('todos', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('simple', title), 'A') || "
+            "setweight(to_tsvector('simple', "
+            "coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=False,
+    ))
+    # The column commits first; the index is then built without blocking
+    # writes, as CONCURRENTLY cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_todos_search_vector', 'todos', ['search_vector'],
+            unique=False, postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_todos_search_vector', table_name='todos',
+            postgresql_using='gin', postgresql_concurrently=True,
+        )
+    op.drop_column('todos', 'search_vector')
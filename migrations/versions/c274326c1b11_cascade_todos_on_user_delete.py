@@ -0,0 +1,37 @@
+"""cascade todos on user delete
+
+Revision ID: c274326c1b11
+Revises: 904d53711558
+Create Date: 2026-10-18 05:27:38.551437
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c274326c1b11'
+down_revision: Union[str, Sequence[str], None] = '904d53711558'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # User.todos no longer loads the collection to delete it, so the
+    # database has to remove a user's todos on its own.
+    op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+    op.create_foreign_key(
+        'todos_user_id_fkey', 'todos', 'users',
+        ['user_id'], ['id'], ondelete='CASCADE',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+    op.create_foreign_key(
+        'todos_user_id_fkey', 'todos', 'users', ['user_id'], ['id'],
+    )
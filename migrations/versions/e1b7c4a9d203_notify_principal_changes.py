@@ -0,0 +1,41 @@
+"""notify principal changes
+
+Revision ID: e1b7c4a9d203
+Revises: 9f6c95322485
+Create Date: 2026-10-18 16:05:41.530918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b7c4a9d203'
+down_revision: Union[str, Sequence[str], None] = '9f6c95322485'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('''
+        CREATE OR REPLACE FUNCTION notify_principal_changed()
+        RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_notify('principal_changed', OLD.id::text);
+            RETURN NULL;
+        END
+        $$
+    ''')
+    op.execute(
+        'CREATE TRIGGER users_notify_principal_changed AFTER UPDATE OF '
+        'username, email, password, token_version OR DELETE ON users '
+        'FOR EACH ROW EXECUTE FUNCTION notify_principal_changed()'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER users_notify_principal_changed ON users')
+    op.execute('DROP FUNCTION notify_principal_changed()')
@@ -1,11 +1,33 @@
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 
+from fast_zero import database, security
+from fast_zero.database import ReadYourWritesMiddleware
+from fast_zero.metrics import CONTENT_TYPE, registry, route_class
 from fast_zero.routers import auth, todos, users
 from fast_zero.schemas import Message
+from fast_zero.sql_stats import QueryStatsMiddleware
 
-app = FastAPI(title='Minha API da hora')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engines and pools belong to the worker process serving the app, so
+    # nothing connected is ever inherited from a parent process
+    await database.open_engines()
+    await security.principal_listener.start()
+    yield
+    # The server has finished in-flight requests by now
+    await security.principal_listener.stop()
+    await database.close_engines()
+    security.password_hasher.shutdown()
+
+
+app = FastAPI(title='Minha API da hora', lifespan=lifespan)
+app.router.route_class = route_class
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
 
 app.include_router(users.router)
 app.include_router(auth.router)
@@ -15,3 +37,8 @@ app.include_router(todos.router)
 @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
 async def read_root():
     return {'message': 'Welcome to Fast Zero'}
+
+
+@app.get('/metrics', include_in_schema=False)
+async def metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
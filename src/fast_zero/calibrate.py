@@ -0,0 +1,102 @@
+"""Pick Argon2 costs that make one verification take a target time here.
+
+Memory is the cost attackers find hardest to scale, so it is kept as
+high as `--max-memory-mib` allows while the time cost rises one pass at
+a time until a verification takes `--target-ms`. If one pass at that
+memory is already too slow, memory is halved until it fits. The result
+is printed as settings for .env:
+
+    python -m fast_zero.calibrate --target-ms 250 >> .env
+"""
+
+import argparse
+import statistics
+import sys
+from time import perf_counter
+
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from fast_zero.settings import Settings
+
+# OWASP's floor for Argon2id memory, 19 MiB
+MIN_MEMORY_COST = 19 * 1024
+MAX_TIME_COST = 20
+
+
+def measure(
+    time_cost: int, memory_cost: int, parallelism: int, rounds: int = 5
+) -> float:
+    """Median seconds this machine takes to verify one password."""
+    hasher = Argon2Hasher(
+        time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )
+    hashed = hasher.hash('calibration password')
+
+    samples = []
+    for _ in range(rounds):
+        start = perf_counter()
+        hasher.verify('calibration password', hashed)
+        samples.append(perf_counter() - start)
+    return statistics.median(samples)
+
+
+def calibrate(
+    target_seconds: float,
+    parallelism: int,
+    max_memory_cost: int,
+    measure=measure,
+) -> dict:
+    """The costs whose verification time comes closest to the target."""
+    memory_cost = max_memory_cost
+    while (
+        memory_cost > MIN_MEMORY_COST
+        and measure(1, memory_cost, parallelism) > target_seconds
+    ):
+        memory_cost = max(memory_cost // 2, MIN_MEMORY_COST)
+
+    time_cost, seconds = 1, measure(1, memory_cost, parallelism)
+    while time_cost < MAX_TIME_COST:
+        slower = measure(time_cost + 1, memory_cost, parallelism)
+        if slower > target_seconds:
+            break
+        time_cost, seconds = time_cost + 1, slower
+
+    return {
+        'time_cost': time_cost,
+        'memory_cost': memory_cost,
+        'parallelism': parallelism,
+        'seconds': seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target-ms', type=float, default=250)
+    parser.add_argument('--parallelism', type=int, default=4)
+    parser.add_argument('--max-memory-mib', type=int, default=64)
+    args = parser.parse_args()
+
+    result = calibrate(
+        args.target_ms / 1000, args.parallelism, args.max_memory_mib * 1024
+    )
+
+    # Every verification slot may hold its memory at once
+    settings = Settings()
+    peak_mib = (
+        result['memory_cost']
+        * settings.LOGIN_MAX_CONCURRENT_VERIFICATIONS
+        / 1024
+    )
+    print(
+        f'# {result["seconds"] * 1000:.0f} ms per verification, up to '
+        f'{peak_mib:.0f} MiB with '
+        f'{settings.LOGIN_MAX_CONCURRENT_VERIFICATIONS} running at once',
+        file=sys.stderr,
+    )
+    print(f'ARGON2_TIME_COST={result["time_cost"]}')
+    print(f'ARGON2_MEMORY_COST={result["memory_cost"]}')
+    print(f'ARGON2_PARALLELISM={result["parallelism"]}')
+
+
+if __name__ == '__main__':
+    main()
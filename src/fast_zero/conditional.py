@@ -0,0 +1,57 @@
+"""ETags derived from users.change_version, for conditional GETs.
+
+The version changes on every write that could alter what a user reads,
+so a matching If-None-Match can be answered with 304 after a primary key
+lookup, before the real query runs or anything is serialized.
+"""
+
+from hashlib import blake2b
+from http import HTTPStatus
+
+from fastapi import Request, Response
+from sqlalchemy import select
+
+from fast_zero.db_models import User
+
+# Clients may keep responses but must revalidate them every time
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+PUBLIC_CACHE_CONTROL = 'no-cache'
+
+
+async def change_version(session, user_id: int) -> int | None:
+    return await session.scalar(
+        select(User.change_version).where(User.id == user_id)
+    )
+
+
+def make_etag(*parts) -> str:
+    """A weak ETag identifying a representation built from `parts`."""
+    digest = blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names `etag`, using weak comparison."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+
+    if header.strip() == '*':
+        return True
+
+    opaque = etag.removeprefix('W/')
+    return any(
+        candidate.strip().removeprefix('W/') == opaque
+        for candidate in header.split(',')
+    )
+
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    return {'ETag': etag, 'Cache-Control': cache_control}
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED,
+        headers=cache_headers(etag, cache_control),
+    )
@@ -1,20 +1,315 @@
+import asyncio
+from contextlib import asynccontextmanager
 from http import HTTPStatus
+from math import ceil
+from time import monotonic, perf_counter, time
 
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import raiseload
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.datastructures import MutableHeaders
 
 from fast_zero.settings import Settings
+from fast_zero.sql_stats import instrument_engine
 
-engine = create_async_engine(Settings().DATABASE_URL)
+settings = Settings()
+READ_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+# Commit time of the client's last write, carried between workers
+WRITE_COOKIE = 'last_write'
 
 
-async def get_session():  # pragma: no cover
-    async with AsyncSession(
-        engine, expire_on_commit=False
-    ) as session:  # pragma: no cover
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that also records how long callers wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+
+        finally:
+            waited = perf_counter() - start
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+def make_engine(url: str, **overrides):
+    """Create an async engine with the pool configured in Settings."""
+    options = {
+        'poolclass': InstrumentedPool,
+        'pool_size': settings.DATABASE_POOL_SIZE,
+        'max_overflow': settings.DATABASE_MAX_OVERFLOW,
+        'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE,
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+        'connect_args': {
+            'prepare_threshold': settings.DATABASE_PREPARE_THRESHOLD
+        },
+    }
+    options.update(overrides)
+    return instrument_engine(create_async_engine(url, **options))
+
+
+# Created in each worker process by open_engines(), from the app lifespan
+engine = None
+replica_engine = None
+replica_router = None
+
+
+class ReplicaRouter:
+    """Choose between the primary and the read replica for a request.
+
+    Reads go to the replica unless the client committed a write within
+    `read_your_writes_seconds` (so it sees its own writes despite
+    replication lag) or the replica failed to connect within the last
+    `retry_seconds`. Times are wall clock, as the write time comes back
+    from the client and may have been recorded by another worker.
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        primary,
+        replica,
+        read_your_writes_seconds: float,
+        retry_seconds: float,
+        clock=time,
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self._replica_down_until = 0.0
+
+    def engine_for(self, method: str, last_write: float | None):
+        if self.replica is None or method not in READ_METHODS:
+            return self.primary
+
+        if self._clock() < self._replica_down_until:
+            return self.primary
+
+        if (
+            last_write is not None
+            and self._clock() - last_write < self.read_your_writes_seconds
+        ):
+            return self.primary
+
+        return self.replica
+
+    def mark_replica_down(self):
+        self._replica_down_until = self._clock() + self.retry_seconds
+
+
+async def warm_pool(target, connections: int):
+    """Open `connections` pooled connections now, not on first requests."""
+    opened = await asyncio.gather(
+        *(target.connect() for _ in range(connections))
+    )
+    for connection in opened:
+        await connection.close()
+
+
+async def drain_pool(target, timeout: float, interval: float = 0.05):
+    """Wait up to `timeout` seconds for checked-out connections to return."""
+    deadline = monotonic() + timeout
+    while target.pool.checkedout() and monotonic() < deadline:
+        await asyncio.sleep(interval)
+
+
+async def open_engines():
+    """Create this process's engines and warm their pools."""
+    global engine, replica_engine, replica_router  # noqa: PLW0603
+
+    engine = make_engine(settings.DATABASE_URL)
+    replica_engine = (
+        make_engine(settings.DATABASE_REPLICA_URL)
+        if settings.DATABASE_REPLICA_URL
+        else None
+    )
+    replica_router = ReplicaRouter(
+        primary=engine,
+        replica=replica_engine,
+        read_your_writes_seconds=settings.REPLICA_READ_YOUR_WRITES_SECONDS,
+        retry_seconds=settings.REPLICA_RETRY_SECONDS,
+    )
+
+    if settings.DATABASE_POOL_WARM:
+        for target in (engine, replica_engine):
+            if target is not None:
+                await warm_pool(target, settings.DATABASE_POOL_WARM)
+
+
+async def close_engines():
+    """Let in-flight work return its connections, then close them all."""
+    global engine, replica_engine, replica_router  # noqa: PLW0603
+
+    for target in (engine, replica_engine):
+        if target is not None:
+            await drain_pool(target, settings.DATABASE_DRAIN_SECONDS)
+            await target.dispose()
+
+    engine = replica_engine = replica_router = None
+
+
+@asynccontextmanager
+async def engines_open():
+    """Engines for scripts, which run without the app lifespan."""
+    await open_engines()
+    try:
+        yield
+
+    finally:
+        await close_engines()
+
+
+def last_write(request: Request) -> float | None:
+    """When the client last committed a write, from its cookie.
+
+    The cookie is not signed: a forged one can at most send its own
+    reads to the primary.
+    """
+    try:
+        return float(request.cookies[WRITE_COOKIE])
+
+    except (KeyError, ValueError):
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Send the commit time of a request's write back as a cookie.
+
+    Whichever worker serves the client's next read then knows to use the
+    primary while the replica may still lag behind that write.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        # Shared with request.state, where get_session records the commit
+        state = scope.setdefault('state', {})
+
+        async def send_wrapper(message):
+            committed_at = state.get('committed_at')
+            if (
+                committed_at is not None
+                and message['type'] == 'http.response.start'
+            ):
+                max_age = ceil(settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+                MutableHeaders(scope=message).append(
+                    'set-cookie',
+                    f'{WRITE_COOKIE}={committed_at:.3f}; Max-Age={max_age}; '
+                    'Path=/; HttpOnly; SameSite=lax',
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def pool_stats(target=None) -> dict:
+    """Current occupancy of an engine's pool and its wait statistics."""
+    pool = (target or engine).pool
+    stats = {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': pool.overflow(),
+    }
+
+    if isinstance(pool, InstrumentedPool):
+        stats.update({
+            'checkouts': pool.checkouts,
+            'timeouts': pool.timeouts,
+            'wait_seconds_total': pool.wait_seconds_total,
+            'wait_seconds_max': pool.wait_seconds_max,
+        })
+
+    return stats
+
+
+def _raiseload_everything(execute_state):
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+    ):
+        execute_state.statement = execute_state.statement.options(
+            raiseload('*', sql_only=True)
+        )
+
+
+def raise_on_lazy_load(session: AsyncSession) -> AsyncSession:
+    """Make relationship lazy loads on `session` raise instead of querying.
+
+    Relationships are lazy by default; routes that need related objects
+    must ask for them with loader options such as `selectinload`.
+    """
+    event.listen(session.sync_session, 'do_orm_execute', _raiseload_everything)
+    return session
+
+
+def _new_session(bind) -> AsyncSession:  # pragma: no cover
+    session = AsyncSession(bind, expire_on_commit=False)
+    if settings.RAISE_ON_LAZY_LOAD:
+        raise_on_lazy_load(session)
+    return session
+
+
+async def get_session(request: Request):  # pragma: no cover
+    bind = replica_router.engine_for(request.method, last_write(request))
+    session = _new_session(bind)
+
+    if replica_router.replica is not None and bind is replica_router.primary:
+        # Stamped when the transaction commits, however long it took, so
+        # the replica has had no time to catch up yet
+        @event.listens_for(session.sync_session, 'after_commit')
+        def record_commit(_):
+            request.state.committed_at = time()
+
+    if bind is not replica_router.primary:
+        # Check out the replica connection up front so an unreachable
+        # replica falls back to the primary instead of failing the request
+        try:
+            await session.connection()
+
+        except OperationalError:
+            await session.close()
+            replica_router.mark_replica_down()
+            session = _new_session(replica_router.primary)
+
+    async with session:  # pragma: no cover
         yield session  # pragma: no cover
 
 
+async def release_connection(session: AsyncSession):
+    """Hand the session's connection back to the pool before slow work.
+
+    Ends the current transaction; loaded objects stay usable because
+    sessions never expire them on commit.
+    """
+    if session.in_transaction():
+        await session.commit()
+
+
 def raise_user_not_found():
     raise HTTPException(
         status_code=HTTPStatus.NOT_FOUND, detail='User not found'
@@ -48,3 +343,37 @@ def raise_forbidden():
         status_code=HTTPStatus.FORBIDDEN,
         detail='Not enough permission',
     )
+
+
+def raise_service_unavailable():
+    raise HTTPException(
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        detail='Server busy, try again later',
+        headers={'Retry-After': '1'},
+    )
+
+
+def raise_too_many_requests(retry_after: int):
+    raise HTTPException(
+        status_code=HTTPStatus.TOO_MANY_REQUESTS,
+        detail='Too many login attempts, try again later',
+        headers={'Retry-After': str(retry_after)},
+    )
+
+
+def raise_invalid_cursor():
+    raise HTTPException(
+        status_code=HTTPStatus.BAD_REQUEST,
+        detail='Invalid pagination cursor',
+    )
+
+
+def raise_format_unavailable(export_format: str):
+    raise HTTPException(
+        status_code=HTTPStatus.NOT_IMPLEMENTED,
+        detail=f'Export format {export_format!r} is not available',
+    )
+
+
+def raise_invalid_import(detail: str):
+    raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail)
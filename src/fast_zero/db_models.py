@@ -1,11 +1,27 @@
 from __future__ import annotations
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import ForeignKey, func
+from uuid import UUID
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Computed,
+    ForeignKey,
+    Index,
+    LargeBinary,
+    event,
+    func,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
 
+# Text search configuration used to index and query todos
+SEARCH_CONFIG = 'simple'
+# Channel on which user changes are announced to every worker
+PRINCIPAL_CHANNEL = 'principal_changed'
+
 
 class TodoState(str, Enum):
     draft = 'draft'
@@ -29,10 +45,18 @@ class User:
     updated_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now(), onupdate=func.now()
     )
+    # Bumped by user updates and, through triggers, by every todo write
+    change_version: Mapped[int] = mapped_column(
+        BigInteger, init=False, server_default='0'
+    )
+    # Access tokens carry the version they were issued at; bumping it
+    # revokes them all
+    token_version: Mapped[int] = mapped_column(init=False, server_default='0')
     todos: Mapped[list['ToDo']] = relationship(
         back_populates='user',
         cascade='all, delete-orphan',
-        lazy='selectin',
+        passive_deletes=True,
+        lazy='select',
         init=False,
     )
 
@@ -40,16 +64,26 @@ class User:
 @table_registry.mapped_as_dataclass
 class ToDo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        # Every route filters by owner; lists page by id, optionally by state
+        Index('ix_todos_user_id_id', 'user_id', 'id'),
+        Index('ix_todos_user_id_state_id', 'user_id', 'state', 'id'),
+        Index(
+            'ix_todos_search_vector', 'search_vector', postgresql_using='gin'
+        ),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
     description: Mapped[str]
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
 
     # --- FIX #3: Add a relationship back to the single User owner ---
     user: Mapped['User'] = relationship(
         back_populates='todos',
-        lazy='selectin',
+        lazy='select',
         init=False,
     )
 
@@ -64,3 +98,170 @@ class ToDo:
     updated_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now(), onupdate=func.now()
     )
+
+    # Title matches rank above description matches
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', title), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+            "coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        init=False,
+        deferred=True,
+    )
+
+
+@table_registry.mapped_as_dataclass
+class ToDoCount:
+    """How many todos a user has in one state, kept by triggers on todos."""
+
+    __tablename__ = 'todo_counts'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default='0'
+    )
+
+
+@table_registry.mapped_as_dataclass
+class RefreshToken:
+    """A refresh token, stored only as the SHA-256 digest of its value.
+
+    Each use replaces the token with a new one in the same family and marks
+    it rotated; a rotated token used again revokes its whole family.
+    """
+
+    __tablename__ = 'refresh_tokens'
+    __table_args__ = (
+        Index('ix_refresh_tokens_user_id', 'user_id'),
+        Index('ix_refresh_tokens_family_id', 'family_id'),
+    )
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    digest: Mapped[bytes] = mapped_column(LargeBinary(32), unique=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+    family_id: Mapped[UUID]
+    expires_at: Mapped[datetime]
+    created_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+    rotated_at: Mapped[datetime | None] = mapped_column(default=None)
+
+
+# Statement-level, so a bulk write or COPY bumps each owner once. Postgres
+# only allows transition tables on single-event triggers, hence three.
+BUMP_OWNER_VERSIONS = DDL('''
+CREATE OR REPLACE FUNCTION bump_todo_owner_versions() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE users SET change_version = change_version + 1
+        WHERE id IN (SELECT user_id FROM new_todos);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE users SET change_version = change_version + 1
+        WHERE id IN (SELECT user_id FROM old_todos);
+    ELSE
+        UPDATE users SET change_version = change_version + 1
+        WHERE id IN (
+            SELECT user_id FROM new_todos
+            UNION SELECT user_id FROM old_todos
+        );
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER todos_bump_versions_on_insert AFTER INSERT ON todos
+REFERENCING NEW TABLE AS new_todos
+FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_owner_versions();
+
+CREATE TRIGGER todos_bump_versions_on_update AFTER UPDATE ON todos
+REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos
+FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_owner_versions();
+
+CREATE TRIGGER todos_bump_versions_on_delete AFTER DELETE ON todos
+REFERENCING OLD TABLE AS old_todos
+FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_owner_versions();
+''')
+
+event.listen(ToDo.__table__, 'after_create', BUMP_OWNER_VERSIONS)
+
+
+# Applies each statement's net change per (user, state) in the same
+# transaction. The join on users skips owners deleted by the statement
+# that cascaded to their todos.
+MAINTAIN_TODO_COUNTS = DDL('''
+CREATE OR REPLACE FUNCTION apply_todo_count_deltas() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO todo_counts AS c (user_id, state, count)
+        SELECT d.user_id, d.state, count(*)
+        FROM new_todos AS d JOIN users AS u ON u.id = d.user_id
+        GROUP BY d.user_id, d.state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = c.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO todo_counts AS c (user_id, state, count)
+        SELECT d.user_id, d.state, -count(*)
+        FROM old_todos AS d JOIN users AS u ON u.id = d.user_id
+        GROUP BY d.user_id, d.state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = c.count + EXCLUDED.count;
+    ELSE
+        INSERT INTO todo_counts AS c (user_id, state, count)
+        SELECT d.user_id, d.state, sum(d.delta)
+        FROM (
+            SELECT user_id, state, 1 AS delta FROM new_todos
+            UNION ALL SELECT user_id, state, -1 FROM old_todos
+        ) AS d JOIN users AS u ON u.id = d.user_id
+        GROUP BY d.user_id, d.state
+        HAVING sum(d.delta) <> 0
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = c.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER todos_count_on_insert AFTER INSERT ON todos
+REFERENCING NEW TABLE AS new_todos
+FOR EACH STATEMENT EXECUTE FUNCTION apply_todo_count_deltas();
+
+CREATE TRIGGER todos_count_on_update AFTER UPDATE ON todos
+REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos
+FOR EACH STATEMENT EXECUTE FUNCTION apply_todo_count_deltas();
+
+CREATE TRIGGER todos_count_on_delete AFTER DELETE ON todos
+REFERENCING OLD TABLE AS old_todos
+FOR EACH STATEMENT EXECUTE FUNCTION apply_todo_count_deltas();
+''')
+
+event.listen(ToDo.__table__, 'after_create', MAINTAIN_TODO_COUNTS)
+
+
+# Row-level and limited to the columns a principal is built from, so the
+# change_version bumps made for every todo write stay silent. Postgres
+# delivers the notification only if the transaction commits.
+NOTIFY_PRINCIPAL_CHANGES = DDL(f'''
+CREATE OR REPLACE FUNCTION notify_principal_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('{PRINCIPAL_CHANNEL}', OLD.id::text);
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER users_notify_principal_changed
+AFTER UPDATE OF username, email, password, token_version OR DELETE ON users
+FOR EACH ROW EXECUTE FUNCTION notify_principal_changed();
+''')
+
+event.listen(User.__table__, 'after_create', NOTIFY_PRINCIPAL_CHANGES)
@@ -0,0 +1,108 @@
+import csv
+import io
+
+from pydantic_core import to_json
+from sqlalchemy import select
+
+from fast_zero.db_models import ToDo
+
+EXPORT_COLUMNS = (
+    ToDo.id,
+    ToDo.title,
+    ToDo.description,
+    ToDo.state,
+    ToDo.created_at,
+    ToDo.updated_at,
+)
+FIELDNAMES = [column.key for column in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+
+async def _partitions(session, criteria, chunk_size):
+    """Yield matching rows `chunk_size` at a time from a server-side cursor."""
+    result = await session.stream(
+        select(*EXPORT_COLUMNS)
+        .where(*criteria)
+        .order_by(ToDo.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+
+def _drain(buffer: io.BytesIO | io.StringIO):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+async def _ndjson(partitions):
+    async for partition in partitions:
+        yield b''.join(to_json(row._asdict()) + b'\n' for row in partition)
+
+
+async def _csv(partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDNAMES)
+
+    async for partition in partitions:
+        writer.writerows(
+            (*row[:3], row.state.value, *row[4:]) for row in partition
+        )
+        yield _drain(buffer).encode()
+
+    yield _drain(buffer).encode()
+
+
+async def _arrow(partitions):
+    import pyarrow as pa  # noqa: PLC0415
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('title', pa.string()),
+        ('description', pa.string()),
+        ('state', pa.string()),
+        ('created_at', pa.timestamp('us')),
+        ('updated_at', pa.timestamp('us')),
+    ])
+    buffer = io.BytesIO()
+    writer = pa.ipc.new_stream(buffer, schema)
+
+    async for partition in partitions:
+        columns = list(zip(*partition))
+        columns[3] = [state.value for state in columns[3]]
+        writer.write_batch(pa.record_batch(columns, schema=schema))
+        yield _drain(buffer)
+
+    writer.close()
+    yield _drain(buffer)
+
+
+ENCODERS = {'ndjson': _ndjson, 'csv': _csv, 'arrow': _arrow}
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401, PLC0415
+
+    except ImportError:
+        return False
+
+    return True
+
+
+def stream_todos(session, criteria, export_format: str, chunk_size: int):
+    """Encode every todo matching `criteria` as a stream of byte chunks.
+
+    Only one chunk of rows is held in memory at a time, whatever the
+    number of matching todos.
+    """
+    partitions = _partitions(session, criteria, chunk_size)
+    return ENCODERS[export_format](partitions)
@@ -0,0 +1,238 @@
+"""Bulk-load todos with Postgres COPY.
+
+Every record is validated with TodoSchema; invalid ones are reported by
+line number and skipped while the valid ones are sent in chunks of
+IMPORT_CHUNK_SIZE rows, one `COPY todos ... FROM STDIN` each. Also usable
+from the command line:
+
+    python -m fast_zero.importer --email alice@example.com todos.ndjson
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import sys
+
+import psycopg
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero import database
+from fast_zero.database import raise_invalid_import
+from fast_zero.db_models import User
+from fast_zero.schemas import TodoSchema
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+COPY_TODOS = 'COPY todos (title, description, state, user_id) FROM STDIN'
+CSV_FIELDS = frozenset(TodoSchema.model_fields)
+READ_SIZE = 64 * 1024
+
+
+async def _lines(chunks):
+    """Split a stream of byte chunks into lines without the newline."""
+    pending = b''
+    async for chunk in chunks:
+        *lines, pending = (pending + chunk).split(b'\n')
+        for line in lines:
+            yield line
+
+    if pending:
+        yield pending
+
+
+async def _records(chunks, quote: bytes | None = None):
+    """Yield (first line number, record) pairs.
+
+    With `quote`, lines are joined while a quoted field is still open, so
+    CSV values may contain newlines.
+    """
+    record, quotes, number = [], 0, 0
+
+    async for line in _lines(chunks):
+        number += 1
+        record.append(line)
+        if quote:
+            quotes += line.count(quote)
+            if quotes % 2:
+                continue
+
+        yield number - len(record) + 1, b'\n'.join(record)
+        record, quotes = [], 0
+
+    if record:
+        yield number - len(record) + 1, b'\n'.join(record)
+
+
+def _error_messages(exc: ValidationError) -> list[str]:
+    return [
+        f'{".".join(map(str, error["loc"])) or "record"}: {error["msg"]}'
+        for error in exc.errors()
+    ]
+
+
+async def _parse_ndjson(chunks):
+    async for line, record in _records(chunks):
+        if not record.strip():
+            continue
+
+        try:
+            yield line, TodoSchema.model_validate_json(record), None
+
+        except ValidationError as exc:
+            yield line, None, _error_messages(exc)
+
+
+async def _parse_csv(chunks):
+    header = None
+
+    async for line, record in _records(chunks, quote=b'"'):
+        if not record.strip():
+            continue
+
+        try:
+            values = next(csv.reader([record.decode()]))
+
+        except (UnicodeDecodeError, csv.Error) as exc:
+            yield line, None, [f'record: {exc}']
+            continue
+
+        if header is None:
+            header = values
+            if not {'title'} <= set(header) <= CSV_FIELDS:
+                raise_invalid_import(
+                    'CSV header must name title and may name '
+                    'description and state'
+                )
+            continue
+
+        if len(values) != len(header):
+            yield line, None, [f'record: expected {len(header)} fields']
+            continue
+
+        # Empty CSV cells fall back to the schema defaults
+        data = {field: value for field, value in zip(header, values) if value}
+
+        try:
+            yield line, TodoSchema.model_validate(data), None
+
+        except ValidationError as exc:
+            yield line, None, _error_messages(exc)
+
+
+PARSERS = {'ndjson': _parse_ndjson, 'csv': _parse_csv}
+
+
+def _report(result: dict, line: int, errors: list[str]):
+    if len(result['errors']) < settings.IMPORT_MAX_ERRORS:
+        result['errors'].append({'line': line, 'errors': errors})
+
+
+async def _copy_chunk(session: AsyncSession, rows: list, lines: list, result):
+    """COPY one chunk under a savepoint; a rejected chunk fails as a whole."""
+    try:
+        async with session.begin_nested():
+            connection = await session.connection()
+            raw_connection = await connection.get_raw_connection()
+            async with raw_connection.driver_connection.cursor() as cursor:
+                async with cursor.copy(COPY_TODOS) as copy:
+                    for row in rows:
+                        await copy.write_row(row)
+
+    except (psycopg.DataError, psycopg.IntegrityError) as exc:
+        result['failed'] += len(rows)
+        _report(
+            result,
+            lines[0],
+            [f'lines {lines[0]}-{lines[-1]}: {exc.diag.message_primary}'],
+        )
+        return
+
+    result['imported'] += len(rows)
+
+
+async def copy_todos(
+    session: AsyncSession, user_id: int, chunks, import_format: str
+) -> dict:
+    """COPY the valid todos read from `chunks` into the user's list.
+
+    At most IMPORT_CHUNK_SIZE parsed rows are held at a time, so memory
+    does not grow with the size of the upload. The caller commits.
+    """
+    result = {'imported': 0, 'failed': 0, 'errors': []}
+    rows, lines = [], []
+
+    async for line, todo, errors in PARSERS[import_format](chunks):
+        if errors:
+            result['failed'] += 1
+            _report(result, line, errors)
+            continue
+
+        # todos.description is NOT NULL
+        rows.append((
+            todo.title,
+            todo.description or '',
+            todo.state.value,
+            user_id,
+        ))
+        lines.append(line)
+        if len(rows) >= settings.IMPORT_CHUNK_SIZE:
+            await _copy_chunk(session, rows, lines, result)
+            rows, lines = [], []
+
+    if rows:
+        await _copy_chunk(session, rows, lines, result)
+
+    return result
+
+
+async def _read_file(path: str):
+    with open(path, 'rb') as file:
+        while chunk := file.read(READ_SIZE):
+            yield chunk
+
+
+async def _import_file(email: str, path: str, import_format: str):
+    async with database.engines_open():
+        async with AsyncSession(
+            database.engine, expire_on_commit=False
+        ) as session:
+            user_id = await session.scalar(
+                select(User.id).where(User.email == email)
+            )
+            if user_id is None:
+                sys.exit(f'No user with email {email}')
+
+            try:
+                result = await copy_todos(
+                    session, user_id, _read_file(path), import_format
+                )
+
+            except HTTPException as exc:
+                sys.exit(exc.detail)
+
+            await session.commit()
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--email', required=True, help='owner of the todos')
+    parser.add_argument('--format', choices=PARSERS, default=None)
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    import_format = args.format or (
+        'csv' if args.path.endswith('.csv') else 'ndjson'
+    )
+    result = asyncio.run(_import_file(args.email, args.path, import_format))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""In-process metrics rendered in the Prometheus text format.
+
+Metrics are plain counters updated from the event loop thread, so
+recording one costs a dict lookup and an addition. Each worker process
+keeps its own registry.
+"""
+
+from bisect import bisect_left
+from time import perf_counter
+
+from fastapi.routing import APIRoute
+
+from fast_zero import database
+from fast_zero.settings import Settings
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+settings = Settings()
+
+
+def _escape(value) -> str:
+    return (
+        str(value)
+        .replace('\\', r'\\')
+        .replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _labels(names, values, extra='') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, *labels, value):
+        """Mirror a total that is counted elsewhere."""
+        self.values[labels] = value
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames=(),
+        buckets=DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values = {}
+
+    def observe(self, value: float, *labels):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def samples(self):
+        for labels, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), state):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield (
+                    f'{self.name}_bucket',
+                    _labels(self.labelnames, labels, le),
+                    cumulative,
+                )
+            names = _labels(self.labelnames, labels)
+            yield f'{self.name}_count', names, cumulative
+            yield f'{self.name}_sum', names, state[-1]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Run `collector()` before each render, to refresh gauges."""
+        self.collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(
+                f'{name}{labels} {_number(value)}'
+                for name, labels, value in metric.samples()
+            )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter(
+        'http_requests_total',
+        'HTTP requests handled, by route template and status.',
+        ('method', 'route', 'status'),
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        'http_request_duration_seconds',
+        'Time from receiving an HTTP request to finishing its response.',
+        ('method', 'route'),
+    )
+)
+http_requests_in_progress = registry.register(
+    Gauge(
+        'http_requests_in_progress',
+        'HTTP requests currently being handled.',
+        ('method', 'route'),
+    )
+)
+password_hash_duration = registry.register(
+    Histogram(
+        'password_hash_duration_seconds',
+        'Time spent computing Argon2 hashes and verifications.',
+        ('operation',),
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    )
+)
+password_hash_wait = registry.register(
+    Histogram(
+        'password_hash_wait_seconds',
+        'Time Argon2 jobs waited for a free worker.',
+        ('operation',),
+    )
+)
+jwt_failures = registry.register(
+    Counter(
+        'jwt_decode_failures_total',
+        'Bearer tokens rejected while authenticating, by reason.',
+        ('reason',),
+    )
+)
+login_rejections = registry.register(
+    Counter(
+        'login_rate_limited_total',
+        'Login attempts refused with 429, by the limit they hit.',
+        ('reason',),
+    )
+)
+principal_cache_lookups = registry.register(
+    Counter(
+        'principal_cache_lookups_total',
+        'Principal cache lookups in get_current_user, by result.',
+        ('result',),
+    )
+)
+principal_cache_evictions = registry.register(
+    Counter(
+        'principal_cache_evictions_total',
+        'Principals evicted from the cache to make room.',
+    )
+)
+principal_cache_entries = registry.register(
+    Gauge(
+        'principal_cache_entries',
+        'Principals currently held in the cache.',
+    )
+)
+
+db_pool_connections = registry.register(
+    Gauge(
+        'db_pool_connections',
+        'Connections held by each engine pool, by state.',
+        ('engine', 'state'),
+    )
+)
+db_pool_checkouts = registry.register(
+    Counter(
+        'db_pool_checkouts_total',
+        'Connections handed out by each engine pool.',
+        ('engine',),
+    )
+)
+db_pool_timeouts = registry.register(
+    Counter(
+        'db_pool_timeouts_total',
+        'Checkouts that gave up waiting for a free connection.',
+        ('engine',),
+    )
+)
+db_pool_wait = registry.register(
+    Counter(
+        'db_pool_wait_seconds_total',
+        'Time spent waiting for pool connections.',
+        ('engine',),
+    )
+)
+
+
+@registry.add_collector
+def collect_pool_stats():
+    engines = {'primary': database.engine, 'replica': database.replica_engine}
+    for name, engine in engines.items():
+        if engine is None:
+            continue
+
+        stats = database.pool_stats(engine)
+        for state in ('checked_out', 'checked_in', 'overflow'):
+            db_pool_connections.set(name, state, value=stats[state])
+
+        if 'checkouts' in stats:
+            db_pool_checkouts.set(name, value=stats['checkouts'])
+            db_pool_timeouts.set(name, value=stats['timeouts'])
+            db_pool_wait.set(name, value=stats['wait_seconds_total'])
+
+
+class InstrumentedRoute(APIRoute):
+    """Route recording its request count, latency and in-flight requests.
+
+    Measuring in the route rather than in a middleware labels requests by
+    path template for free: a middleware would have to match the path
+    against every route a second time.
+    """
+
+    async def handle(self, scope, receive, send):
+        method = scope['method']
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        http_requests_in_progress.inc(method, self.path)
+        start = perf_counter()
+        try:
+            await super().handle(scope, receive, send_wrapper)
+
+        finally:
+            http_request_duration.observe(
+                perf_counter() - start, method, self.path
+            )
+            http_requests.inc(method, self.path, str(status))
+            http_requests_in_progress.dec(method, self.path)
+
+
+route_class = InstrumentedRoute if settings.METRICS_ENABLED else APIRoute
@@ -0,0 +1,78 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from sqlalchemy import tuple_
+
+from fast_zero.database import raise_invalid_cursor
+from fast_zero.schemas import FilterUsers
+
+
+def encode_cursor(values: list) -> str:
+    """Pack the sort key of the last row of a page into an opaque token."""
+    payload = json.dumps(values, separators=(',', ':')).encode()
+    return urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(urlsafe_b64decode(cursor + padding))
+
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise_invalid_cursor()
+
+    if not isinstance(values, list) or len(values) != size:
+        raise_invalid_cursor()
+
+    # Every sort key in use is numeric
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise_invalid_cursor()
+
+    return values
+
+
+async def fetch_page(
+    session, query, key_columns, page: FilterUsers, descending=False
+):
+    """Return one page of `query` and the cursor of the page after it.
+
+    Rows are ordered by `key_columns`, which must identify a row uniquely.
+    With a cursor the page starts right after the row it encodes, using
+    the index on the key instead of scanning past `offset` rows.
+
+    An entity query returns its objects; a query of several columns
+    returns one dict per row, keyed by column name.
+    """
+    width = len(query.column_descriptions)
+    if descending:
+        order_by = [column.desc() for column in key_columns]
+    else:
+        order_by = key_columns
+
+    query = query.add_columns(*key_columns).order_by(*order_by)
+
+    if page.cursor:
+        values = decode_cursor(page.cursor, len(key_columns))
+        if descending:
+            query = query.where(tuple_(*key_columns) < tuple_(*values))
+        else:
+            query = query.where(tuple_(*key_columns) > tuple_(*values))
+
+    else:
+        query = query.offset(page.offset)
+
+    result = await session.execute(query.limit(page.limit + 1))
+    keys = list(result.keys())[:width]
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_cursor = encode_cursor(list(rows[-1][width:]))
+
+    if width == 1:
+        return [row[0] for row in rows], next_cursor
+
+    return [dict(zip(keys, row)) for row in rows], next_cursor
@@ -0,0 +1,145 @@
+"""Admission control for the login endpoint.
+
+Each login attempt is counted in a sliding window per email and per
+client address, and the password verifications running at once are
+capped. Attempts over either limit get 429 before any Argon2 work.
+
+Window state lives in a backend named by RATE_LIMIT_BACKEND as
+`module:Class`. MemoryBackend keeps it in the worker process; with
+several workers each one counts separately, so a backend shared by all
+workers is needed for exact limits.
+"""
+
+import math
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from importlib import import_module
+from time import monotonic
+
+from fast_zero.database import raise_too_many_requests
+from fast_zero.metrics import login_rejections
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+
+class RateLimitBackend(ABC):
+    """Where sliding-window hits are recorded."""
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> float | None:
+        """Record a hit on `key` unless it already has `limit` in `window`.
+
+        Returns None when the hit was recorded, otherwise the seconds
+        until the oldest hit leaves the window.
+        """
+
+    @abstractmethod
+    async def reset(self):
+        """Forget every recorded hit."""
+
+
+class MemoryBackend(RateLimitBackend):
+    """Sliding-window logs kept in this process, for `max_keys` keys."""
+
+    def __init__(self, max_keys: int = 100_000, clock=monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._hits = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: float) -> float | None:
+        now = self._clock()
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = self._hits[key] = deque()
+        else:
+            self._hits.move_to_end(key)
+
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+
+        if len(hits) >= limit:
+            return hits[0] + window - now
+
+        hits.append(now)
+        # Forgetting the least recent key only ever lets attempts through
+        while len(self._hits) > self.max_keys:
+            self._hits.popitem(last=False)
+        return None
+
+    async def reset(self):
+        self._hits.clear()
+
+
+def make_backend(path: str) -> RateLimitBackend:
+    module, _, name = path.partition(':')
+    return getattr(import_module(module), name)()
+
+
+class LoginLimiter:
+    # Benchmarks of the login path itself switch the limiter off
+    enabled = True
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        window: float,
+        per_email: int,
+        per_address: int,
+        max_concurrent: int,
+    ):
+        self.backend = backend
+        self.window = window
+        self.per_email = per_email
+        self.per_address = per_address
+        self.max_concurrent = max_concurrent
+        self.verifying = 0
+
+    async def check(self, email: str, address: str | None):
+        """Count an attempt, or raise 429 if its email or address is over."""
+        if not self.enabled:
+            return
+
+        limits = [('email', email.casefold(), self.per_email)]
+        if address is not None:
+            limits.append(('address', address, self.per_address))
+
+        for reason, value, limit in limits:
+            retry_after = await self.backend.hit(
+                f'login:{reason}:{value}', limit, self.window
+            )
+            if retry_after is not None:
+                login_rejections.inc(reason)
+                raise_too_many_requests(math.ceil(retry_after))
+
+    @asynccontextmanager
+    async def verification(self):
+        """Hold one of the `max_concurrent` password verification slots."""
+        if not self.enabled:
+            yield
+            return
+
+        if self.verifying >= self.max_concurrent:
+            login_rejections.inc('concurrency')
+            raise_too_many_requests(1)
+
+        self.verifying += 1
+        try:
+            yield
+
+        finally:
+            self.verifying -= 1
+
+    async def reset(self):
+        self.verifying = 0
+        await self.backend.reset()
+
+
+login_limiter = LoginLimiter(
+    backend=make_backend(settings.RATE_LIMIT_BACKEND),
+    window=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    per_email=settings.LOGIN_RATE_LIMIT_PER_EMAIL,
+    per_address=settings.LOGIN_RATE_LIMIT_PER_ADDRESS,
+    max_concurrent=settings.LOGIN_MAX_CONCURRENT_VERIFICATIONS,
+)
@@ -0,0 +1,112 @@
+"""Repair drift between todo_counts and the todos it summarizes.
+
+Triggers keep the counts exact, but rows written with the triggers
+disabled (restores, manual fixes) can leave them off. This recounts each
+user's todos and rewrites the counts that differ:
+
+    python -m fast_zero.reconcile [--user-id 42]
+"""
+
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero import database
+from fast_zero.db_models import ToDo, ToDoCount, User
+
+
+async def reconcile_user(session, user_id: int) -> dict:
+    """Fix the counts of `user_id`; return the ones that were wrong.
+
+    Every todo write also updates the owner's users row, so holding that
+    row's lock keeps the user's todos and counts still while comparing.
+    """
+    await session.execute(
+        select(User.id).where(User.id == user_id).with_for_update()
+    )
+
+    actual = dict(
+        (
+            await session.execute(
+                select(ToDo.state, func.count())
+                .where(ToDo.user_id == user_id)
+                .group_by(ToDo.state)
+            )
+        ).all()
+    )
+    stored = dict(
+        (
+            await session.execute(
+                select(ToDoCount.state, ToDoCount.count).where(
+                    ToDoCount.user_id == user_id
+                )
+            )
+        ).all()
+    )
+
+    drift = {
+        state: {'stored': stored.get(state, 0), 'actual': actual.get(state, 0)}
+        for state in stored.keys() | actual.keys()
+        if stored.get(state, 0) != actual.get(state, 0)
+    }
+    if drift:
+        statement = insert(ToDoCount).values([
+            {'user_id': user_id, 'state': state, 'count': counts['actual']}
+            for state, counts in drift.items()
+        ])
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[ToDoCount.user_id, ToDoCount.state],
+                set_={'count': statement.excluded.count},
+            )
+        )
+        # Invalidate the stats ETags clients hold
+        await session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(change_version=User.change_version + 1)
+        )
+
+    await session.commit()
+    return drift
+
+
+async def reconcile(session, user_id: int | None = None) -> dict:
+    """Reconcile one user, or every user; return the repairs by user id."""
+    if user_id is None:
+        user_ids = (await session.scalars(select(User.id))).all()
+    else:
+        user_ids = [user_id]
+
+    repairs = {}
+    for current in user_ids:
+        # One transaction per user, so writers wait on one user at a time
+        drift = await reconcile_user(session, current)
+        if drift:
+            repairs[current] = drift
+    return repairs
+
+
+async def _reconcile(user_id: int | None):
+    async with database.engines_open():
+        async with AsyncSession(
+            database.engine, expire_on_commit=False
+        ) as session:
+            return await reconcile(session, user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--user-id', type=int, help='only this user')
+    args = parser.parse_args()
+
+    repairs = asyncio.run(_reconcile(args.user_id))
+    print(json.dumps(repairs, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,46 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from fast_zero.database import (
     get_session,
+    raise_credentials_expection,
     raise_unauthorized,
+    release_connection,
 )
-from fast_zero.db_models import User
-from fast_zero.schemas import Token
+from fast_zero.db_models import RefreshToken, User
+from fast_zero.metrics import route_class
+from fast_zero.rate_limit import login_limiter
+from fast_zero.schemas import Message, Token, TokenRefresh
 from fast_zero.security import (
+    access_token_claims,
     create_access_token,
     get_current_user,
-    verify_password,
+    issue_refresh_token,
+    principal_cache,
+    refresh_token_digest,
+    verify_and_update_password_async,
 )
 
-router = APIRouter(prefix='/auth', tags=['auth'])
+router = APIRouter(prefix='/auth', tags=['auth'], route_class=route_class)
 
 UserSession = Annotated[AsyncSession, Depends(get_session)]
 OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
+CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
 # Generate token for login
 @router.post('/token', response_model=Token)
-async def login_to_access_token(form_data: OAuth2Form, session: UserSession):
+async def login_to_access_token(
+    request: Request, form_data: OAuth2Form, session: UserSession
+):
+    # Refuse floods before they reach the database or Argon2
+    address = request.client.host if request.client else None
+    await login_limiter.check(form_data.username, address)
+
     user = await session.scalar(
         select(User).where(User.email == form_data.username)
     )
@@ -33,19 +48,115 @@ async def login_to_access_token(form_data: OAuth2Form, session: UserSession):
     if user is None:
         raise_unauthorized()
 
-    if not verify_password(form_data.password, user.password):
+    await release_connection(session)
+
+    async with login_limiter.verification():
+        verified, new_hash = await verify_and_update_password_async(
+            form_data.password, user.password
+        )
+
+    if not verified:
         raise_unauthorized()
 
-    access_token = create_access_token({'sub': user.email})
+    if new_hash is not None:
+        # Hashed with older Argon2 costs. Matching the old hash as well
+        # keeps a password changed meanwhile from being overwritten.
+        await session.execute(
+            update(User)
+            .where(User.id == user.id, User.password == user.password)
+            .values(password=new_hash)
+        )
+        principal_cache.invalidate(user.id)
+
+    access_token = create_access_token(
+        access_token_claims(user.id, user.token_version)
+    )
+    refresh_token = await issue_refresh_token(session, user.id)
+    await session.commit()
 
-    return {'access_token': access_token, 'token_type': 'Bearer'}
+    return {
+        'access_token': access_token,
+        'token_type': 'Bearer',
+        'refresh_token': refresh_token,
+    }
 
 
 # Refresh token
 @router.post('/refresh_token', response_model=Token)
-async def refresh_access_token(
-    user: Annotated[User, Depends(get_current_user)],
-):
-    new_access_token = create_access_token(data={'sub': user.email})
+async def refresh_access_token(user: CurrentUser):
+    new_access_token = create_access_token(
+        access_token_claims(user.id, user.token_version)
+    )
 
     return {'access_token': new_access_token, 'token_type': 'Bearer'}
+
+
+# Trade a refresh token for a new pair, without the password
+@router.post('/refresh', response_model=Token)
+async def rotate_refresh_token(body: TokenRefresh, session: UserSession):
+    digest = refresh_token_digest(body.refresh_token)
+
+    # Claiming the token and reading its owner is one statement, so two
+    # concurrent uses of the same token cannot both succeed.
+    claimed = await session.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.digest == digest,
+            RefreshToken.rotated_at.is_(None),
+            RefreshToken.expires_at > func.now(),
+            User.id == RefreshToken.user_id,
+        )
+        .values(rotated_at=func.now())
+        .returning(RefreshToken.family_id, User.id, User.token_version)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = claimed.first()
+
+    if claimed is None:
+        # A rotated token coming back means it was copied: whoever holds
+        # the newer one loses the session too.
+        reused_family = (
+            select(RefreshToken.family_id)
+            .where(
+                RefreshToken.digest == digest,
+                RefreshToken.rotated_at.is_not(None),
+            )
+            .scalar_subquery()
+        )
+        await session.execute(
+            delete(RefreshToken).where(RefreshToken.family_id == reused_family)
+        )
+        await session.commit()
+        raise_credentials_expection()
+
+    family_id, user_id, token_version = claimed
+    refresh_token = await issue_refresh_token(session, user_id, family_id)
+    await session.commit()
+
+    access_token = create_access_token(
+        access_token_claims(user_id, token_version)
+    )
+    return {
+        'access_token': access_token,
+        'token_type': 'Bearer',
+        'refresh_token': refresh_token,
+    }
+
+
+# Sign out everywhere
+@router.post('/revoke', response_model=Message)
+async def revoke_access_tokens(user: CurrentUser, session: UserSession):
+    # Other workers drop their cached copy of the user once the commit
+    # notifies them, see PrincipalListener
+    await session.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(token_version=User.token_version + 1)
+    )
+    await session.execute(
+        delete(RefreshToken).where(RefreshToken.user_id == user.id)
+    )
+    await session.commit()
+    principal_cache.invalidate(user.id)
+
+    return {'message': 'All access tokens revoked'}
@@ -1,78 +1,295 @@
-from typing import Annotated
 from http import HTTPStatus
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Annotated, Literal
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Double, cast, delete, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from fast_zero.database import get_session
-from fast_zero.db_models import ToDo, User
+
+from fast_zero.conditional import (
+    PRIVATE_CACHE_CONTROL,
+    cache_headers,
+    change_version,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
+from fast_zero.database import get_session, raise_format_unavailable
+from fast_zero.db_models import SEARCH_CONFIG, ToDo, ToDoCount, TodoState, User
+from fast_zero.export import MEDIA_TYPES, arrow_available, stream_todos
+from fast_zero.importer import copy_todos
+from fast_zero.metrics import route_class
+from fast_zero.pagination import fetch_page
 from fast_zero.schemas import (
     FilterToDo,
+    Message,
+    ToDoBulkResult,
+    ToDoBulkUpdate,
+    ToDoCriteria,
+    ToDoExport,
+    ToDoImportResult,
     TodoPublic,
     TodoSchema,
+    ToDoSelection,
     TodosList,
+    ToDoStats,
     ToDoUpdate,
-    Message)
+)
 from fast_zero.security import get_current_user
+from fast_zero.serialization import TODO_COLUMNS, json_response, todos_page
+from fast_zero.settings import Settings
 
-router = APIRouter(prefix='/todos', tags=['todos'])
+router = APIRouter(prefix='/todos', tags=['todos'], route_class=route_class)
+settings = Settings()
 
 Session = Annotated[AsyncSession, Depends(get_session)]
 CurrentUser = Annotated[User, Depends(get_current_user)]
+TodoBatch = Annotated[
+    list[TodoSchema],
+    Body(min_length=1, max_length=settings.TODO_BATCH_MAX_SIZE),
+]
+
+
+def _search_query(search: str):
+    return func.websearch_to_tsquery(SEARCH_CONFIG, search)
+
+
+def todo_criteria(user_id: int, filters: ToDoCriteria) -> list:
+    """WHERE clauses for the todos of `user_id` that match `filters`."""
+    criteria = [ToDo.user_id == user_id]
+
+    if filters.title:
+        criteria.append(ToDo.title.contains(filters.title))
+
+    if filters.description:
+        criteria.append(ToDo.description.contains(filters.description))
+
+    if filters.state:
+        criteria.append(ToDo.state == filters.state)
+
+    if filters.search:
+        criteria.append(
+            ToDo.search_vector.bool_op('@@')(_search_query(filters.search))
+        )
+
+    return criteria
+
+
+def selection_criteria(user_id: int, selection: ToDoSelection) -> list:
+    criteria = todo_criteria(user_id, selection.filters or ToDoCriteria())
+
+    if selection.ids is not None:
+        criteria.append(ToDo.id.in_(selection.ids))
+
+    return criteria
+
 
 @router.post('/', response_model=TodoPublic)
 async def create_todo(todo: TodoSchema, session: Session, user: CurrentUser):
-    db_todo = ToDo(
-        title=todo.title,
-        description=todo.description,
-        user_id=user.id,
-        state=todo.state,
+    db_todo = await session.scalar(
+        insert(ToDo)
+        .values(
+            title=todo.title,
+            # todos.description is NOT NULL
+            description=todo.description or '',
+            user_id=user.id,
+            state=todo.state,
+        )
+        .returning(ToDo)
     )
-
-    session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
 
     return db_todo
 
 
+@router.post('/batch', response_model=list[TodoPublic])
+async def create_todos_batch(
+    todos: TodoBatch, session: Session, user: CurrentUser
+):
+    # One multi-row INSERT ... RETURNING in one transaction: either every
+    # todo is created or none is.
+    db_todos = await session.scalars(
+        insert(ToDo).returning(ToDo, sort_by_parameter_order=True),
+        [
+            {
+                **todo.model_dump(),
+                'description': todo.description or '',
+                'user_id': user.id,
+            }
+            for todo in todos
+        ],
+    )
+    db_todos = db_todos.all()
+    await session.commit()
+
+    return db_todos
+
+
+@router.post('/import', response_model=ToDoImportResult)
+async def import_todos(
+    request: Request,
+    session: Session,
+    user: CurrentUser,
+    import_format: Annotated[
+        Literal['ndjson', 'csv'], Query(alias='format')
+    ] = 'ndjson',
+):
+    # The body is read as it arrives and COPYed into todos in chunks;
+    # invalid records are reported and skipped, the rest are committed.
+    result = await copy_todos(
+        session, user.id, request.stream(), import_format
+    )
+    await session.commit()
+
+    return result
+
+
 @router.get('/', response_model=TodosList)
 async def list_todos(
+    request: Request,
     todos_filters: Annotated[FilterToDo, Query()],
     session: Session,
     user: CurrentUser,
 ):
-    query = select(ToDo).where(ToDo.user_id == user.id)
+    # Every todo write bumps the owner's version, so an unchanged version
+    # means an unchanged page and the list query can be skipped.
+    version = await change_version(session, user.id)
+    etag = make_etag(user.id, version, request.url.query)
+    if etag_matches(request, etag):
+        return not_modified(etag, PRIVATE_CACHE_CONTROL)
 
-    if todos_filters.title:
-        query = query.filter(ToDo.title.contains(
-            todos_filters.title))
+    # Plain column rows, encoded by a precompiled serializer: no ORM
+    # objects and no second validation of rows we selected ourselves
+    query = select(*TODO_COLUMNS).where(*todo_criteria(user.id, todos_filters))
 
-    if todos_filters.description:
-        query = query.filter(ToDo.description.contains(
-            todos_filters.description))
+    if todos_filters.search:
+        ts_query = _search_query(todos_filters.search)
+        # real -> double, so the rank survives the cursor round trip exactly
+        rank = cast(func.ts_rank(ToDo.search_vector, ts_query), Double)
 
-    if todos_filters.state:
-        query = query.filter(ToDo.state == todos_filters.state)
+        todos, next_cursor = await fetch_page(
+            session, query, [rank, ToDo.id], todos_filters, descending=True
+        )
 
-    todos = await session.scalars(
-        query.limit(todos_filters.limit).offset(todos_filters.offset))
+    else:
+        todos, next_cursor = await fetch_page(
+            session, query, [ToDo.id], todos_filters
+        )
+
+    return json_response(
+        todos_page,
+        {'todos': todos, 'next_cursor': next_cursor},
+        headers=cache_headers(etag, PRIVATE_CACHE_CONTROL),
+    )
+
+
+@router.get('/stats', response_model=ToDoStats)
+async def todo_stats(
+    request: Request, response: Response, session: Session, user: CurrentUser
+):
+    version = await change_version(session, user.id)
+    etag = make_etag(user.id, version, 'stats')
+    if etag_matches(request, etag):
+        return not_modified(etag, PRIVATE_CACHE_CONTROL)
+
+    # Counts are kept per state by triggers on todos, so this reads at most
+    # one row per state whatever the number of todos.
+    rows = await session.execute(
+        select(ToDoCount.state, ToDoCount.count).where(
+            ToDoCount.user_id == user.id
+        )
+    )
+    counts = dict.fromkeys(TodoState, 0) | dict(rows.all())
+
+    response.headers.update(cache_headers(etag, PRIVATE_CACHE_CONTROL))
+    return {'counts': counts, 'total': sum(counts.values())}
 
-    return {'todos': todos.all()}
+
+@router.get('/export')
+async def export_todos(
+    export: Annotated[ToDoExport, Query()],
+    session: Session,
+    user: CurrentUser,
+):
+    if export.format == 'arrow' and not arrow_available():
+        raise_format_unavailable(export.format)
+
+    # Rows come off a server-side cursor one chunk at a time, so memory
+    # stays flat however many todos the user has.
+    chunks = stream_todos(
+        session,
+        todo_criteria(user.id, export),
+        export.format,
+        settings.EXPORT_CHUNK_SIZE,
+    )
+
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[export.format],
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="todos.{export.format}"'
+            )
+        },
+    )
+
+
+@router.patch('/batch', response_model=ToDoBulkResult)
+async def patch_todos_batch(
+    bulk: ToDoBulkUpdate, session: Session, user: CurrentUser
+):
+    # A single UPDATE ... RETURNING, however many todos it touches
+    todo_ids = await session.scalars(
+        update(ToDo)
+        .where(*selection_criteria(user.id, bulk))
+        .values(**bulk.changes.model_dump(exclude_none=True))
+        .returning(ToDo.id)
+        .execution_options(synchronize_session='fetch')
+    )
+    todo_ids = todo_ids.all()
+    await session.commit()
+
+    return {'ids': todo_ids, 'count': len(todo_ids)}
+
+
+@router.delete('/batch', response_model=ToDoBulkResult)
+async def delete_todos_batch(
+    selection: ToDoSelection, session: Session, user: CurrentUser
+):
+    todo_ids = await session.scalars(
+        delete(ToDo)
+        .where(*selection_criteria(user.id, selection))
+        .returning(ToDo.id)
+        .execution_options(synchronize_session='fetch')
+    )
+    todo_ids = todo_ids.all()
+    await session.commit()
+
+    return {'ids': todo_ids, 'count': len(todo_ids)}
 
 
 @router.delete('/{todo_id}', response_model=Message)
 async def delete_todo(todo_id: int, session: Session, user: CurrentUser):
-    todo = await session.scalar(
-        select(ToDo).where(ToDo.user_id == user.id, ToDo.id == todo_id)
+    deleted_id = await session.scalar(
+        delete(ToDo)
+        .where(ToDo.user_id == user.id, ToDo.id == todo_id)
+        .returning(ToDo.id)
     )
 
-    if not todo:
+    if deleted_id is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail='Task not found'
         )
 
-    await session.delete(todo)
     await session.commit()
 
     return {'message': 'Task deleted successfully'}
@@ -84,9 +301,16 @@ async def patch_todo(todo_id: int,
                      user: CurrentUser,
                      todo: ToDoUpdate):
 
-    db_todo = await session.scalar(
-        select(ToDo).where(ToDo.user_id == user.id, ToDo.id == todo_id)
-    )
+    changes = todo.model_dump(exclude_unset=True)
+    owned_todo = (ToDo.user_id == user.id, ToDo.id == todo_id)
+
+    if changes:
+        db_todo = await session.scalar(
+            update(ToDo).where(*owned_todo).values(**changes).returning(ToDo)
+        )
+
+    else:
+        db_todo = await session.scalar(select(ToDo).where(*owned_todo))
 
     if not db_todo:
         raise HTTPException(
@@ -94,11 +318,6 @@ async def patch_todo(todo_id: int,
             detail='Task not found'
         )
 
-    for key, value in todo.model_dump(exclude_unset=True).items():
-        setattr(db_todo, key, value)
-
-    session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
 
     return db_todo
@@ -1,18 +1,29 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import or_, select
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from fast_zero.conditional import (
+    PUBLIC_CACHE_CONTROL,
+    cache_headers,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
 from fast_zero.database import (
     get_session,
     raise_conflict,
     raise_forbidden,
     raise_user_not_found,
+    release_connection,
 )
-from fast_zero.db_models import User
+from fast_zero.db_models import RefreshToken, User
+from fast_zero.metrics import route_class
+from fast_zero.pagination import fetch_page
 from fast_zero.schemas import (
     FilterUsers,
     Message,
@@ -22,10 +33,13 @@ from fast_zero.schemas import (
 )
 from fast_zero.security import (
     get_current_user,
-    get_password_harsh,
+    hash_password_async,
+    principal_cache,
+    verify_password_async,
 )
+from fast_zero.serialization import USER_COLUMNS, json_response, users_page
 
-router = APIRouter(prefix='/users', tags=['users'])
+router = APIRouter(prefix='/users', tags=['users'], route_class=route_class)
 UserSession = Annotated[AsyncSession, Depends(get_session)]
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
@@ -36,44 +50,51 @@ async def read_users(
     current_user: CurrentUser,
     filter_users: Annotated[FilterUsers, Query()],
 ):
-    users = await session.scalars(
-        select(User).limit(filter_users.limit).offset(filter_users.offset)
+    users, next_cursor = await fetch_page(
+        session, select(*USER_COLUMNS), [User.id], filter_users
+    )
+    return json_response(
+        users_page, {'users': users, 'next_cursor': next_cursor}
     )
-    return {'users': users}
 
 
 @router.get('/{user_id}', response_model=UserPublic)
-async def read_single_user(user_id: int, session: UserSession):
+async def read_single_user(
+    user_id: int, request: Request, response: Response, session: UserSession
+):
     user_query = await session.scalar(select(User).where(User.id == user_id))
 
     if user_query is None:
         raise_user_not_found()
-    else:
-        return user_query
+
+    etag = make_etag(user_query.id, user_query.change_version)
+    if etag_matches(request, etag):
+        return not_modified(etag, PUBLIC_CACHE_CONTROL)
+
+    response.headers.update(cache_headers(etag, PUBLIC_CACHE_CONTROL))
+    return user_query
 
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
 async def create_user(user: UserSchema, session: UserSession):
+    # Hash before touching the database so no connection waits on Argon2
+    password = await hash_password_async(user.password)
+
+    # The unique constraints decide conflicts atomically, so concurrent
+    # registrations of the same username or email cannot both succeed.
     db_user = await session.scalar(
-        select(User).where(
-            or_(User.username == user.username, User.email == user.email)
-        )
+        insert(User)
+        .values(username=user.username, email=user.email, password=password)
+        .on_conflict_do_nothing()
+        .returning(User)
     )
 
-    if db_user is not None:
+    if db_user is None:
         raise_conflict()
 
-    else:
-        db_user = User(
-            username=user.username,
-            email=user.email,
-            password=get_password_harsh(user.password),
-        )
-        session.add(db_user)
-        await session.commit()
-        await session.refresh(db_user)
+    await session.commit()
 
-        return db_user
+    return db_user
 
 
 @router.put('/{user_id}', response_model=UserPublic)
@@ -86,16 +107,37 @@ async def update_user(
     if current_user.id != user_id:
         raise_forbidden()
 
-    try:
-        current_user.username = user.username
-        current_user.email = user.email
-        current_user.password = get_password_harsh(user.password)
+    await release_connection(session)
+    statement = update(User).where(User.id == current_user.id)
+
+    # A PUT always carries the password; only a new one ends the user's
+    # sessions, and an unchanged one keeps its hash
+    if await verify_password_async(user.password, current_user.password):
+        password = current_user.password
+
+    else:
+        password = await hash_password_async(user.password)
+        statement = statement.values(
+            token_version=User.token_version + 1
+        ).add_cte(
+            delete(RefreshToken)
+            .where(RefreshToken.user_id == current_user.id)
+            .cte('revoked')
+        )
 
-        session.add(current_user)
+    try:
+        db_user = await session.scalar(
+            statement.values(
+                username=user.username,
+                email=user.email,
+                password=password,
+                change_version=User.change_version + 1,
+            ).returning(User)
+        )
         await session.commit()
-        await session.refresh(current_user)
+        principal_cache.invalidate(user_id)
 
-        return current_user
+        return db_user
 
     except IntegrityError:
         raise_conflict()
@@ -114,5 +156,6 @@ async def delete_user(
         username = current_user.username
         await session.delete(current_user)
         await session.commit()
+        principal_cache.invalidate(user_id)
 
     return {'message': f'User {username} deleted successfully'}
@@ -1,7 +1,29 @@
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from typing import Annotated, Literal
+
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    model_validator,
+)
 
 from fast_zero.db_models import TodoState
 
+MAX_PAGE_SIZE = 100
+MAX_BULK_IDS = 10_000
+
+
+def _reject_nul(value: str) -> str:
+    if '\x00' in value:
+        raise ValueError('NUL characters are not allowed')
+    return value
+
+
+# Postgres text cannot hold NUL, so it is refused before reaching the database
+TodoText = Annotated[str, AfterValidator(_reject_nul)]
+
 
 class Message(BaseModel):
     message: str
@@ -22,33 +44,99 @@ class UserPublic(BaseModel):
 
 class UsersList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
 
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
 
 
 class FilterUsers(BaseModel):
-    limit: int = Field(ge=1, default=10)
+    limit: int = Field(ge=1, le=MAX_PAGE_SIZE, default=10)
     offset: int = Field(ge=0, default=0)
+    # Opaque `next_cursor` from a previous page; takes precedence over offset
+    cursor: str | None = None
 
 
-class FilterToDo(FilterUsers):
+class ToDoCriteria(BaseModel):
     title: str | None = Field(default=None, min_length=3)
     description: str | None = None
     state: TodoState | None = None
+    # Full-text query; listings come back ordered by relevance
+    search: str | None = Field(default=None, min_length=1, max_length=200)
+
+
+class FilterToDo(FilterUsers, ToDoCriteria):
+    pass
+
+
+class ToDoExport(ToDoCriteria):
+    format: Literal['ndjson', 'csv', 'arrow'] = 'ndjson'
 
 
 class ToDoUpdate(BaseModel):
-    title: str | None = None
-    description: str | None = None
+    title: TodoText | None = None
+    description: TodoText | None = None
     state: TodoState | None = None
 
 
+class ToDoSelection(BaseModel):
+    """Todos picked by id, by filter criteria, or by both combined."""
+
+    ids: list[int] | None = Field(
+        default=None, min_length=1, max_length=MAX_BULK_IDS
+    )
+    filters: ToDoCriteria | None = None
+
+    @model_validator(mode='after')
+    def check_selection(self):
+        if self.ids is None and self.filters is None:
+            raise ValueError('Provide ids, filters or both')
+        return self
+
+
+class ToDoBulkUpdate(ToDoSelection):
+    changes: ToDoUpdate
+
+    @model_validator(mode='after')
+    def check_changes(self):
+        if not self.changes.model_dump(exclude_none=True):
+            raise ValueError('changes must set at least one field')
+        return self
+
+
+class ToDoBulkResult(BaseModel):
+    ids: list[int]
+    count: int
+
+
+class ToDoImportError(BaseModel):
+    line: int
+    errors: list[str]
+
+
+class ToDoImportResult(BaseModel):
+    imported: int
+    failed: int
+    # At most IMPORT_MAX_ERRORS entries; `failed` counts every bad record
+    errors: list[ToDoImportError]
+
+
+class ToDoStats(BaseModel):
+    # Every state is present, at zero when the user has none in it
+    counts: dict[TodoState, int]
+    total: int
+
+
 class TodoSchema(BaseModel):
-    title: str
-    description: str | None = None
+    title: TodoText
+    description: TodoText | None = None
     state: TodoState = Field(default=TodoState.todo)
 
 
@@ -58,3 +146,4 @@ class TodoPublic(TodoSchema):
 
 class TodosList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
@@ -1,20 +1,59 @@
+import asyncio
+import logging
+import secrets
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import fields
 from datetime import datetime, timedelta
+from hashlib import sha256
+from time import perf_counter
+from uuid import UUID, uuid4
 from zoneinfo import ZoneInfo
 
+import psycopg
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 from jwt import DecodeError, ExpiredSignatureError, decode, encode
 from pwdlib import PasswordHash
-from sqlalchemy import select
+from pwdlib.hashers.argon2 import Argon2Hasher
+from sqlalchemy import delete, func, insert, inspect, make_url, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
-from fast_zero.database import get_session, raise_credentials_expection
-from fast_zero.db_models import User
+from fast_zero.cache import TTLCache
+from fast_zero.database import (
+    get_session,
+    raise_credentials_expection,
+    raise_service_unavailable,
+)
+from fast_zero.db_models import PRINCIPAL_CHANNEL, RefreshToken, User
+from fast_zero.metrics import (
+    jwt_failures,
+    password_hash_duration,
+    password_hash_wait,
+    principal_cache_entries,
+    principal_cache_evictions,
+    principal_cache_lookups,
+    registry,
+)
 from fast_zero.settings import Settings
 
+logger = logging.getLogger('fast_zero.security')
 ouath2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
-pwd_context = PasswordHash.recommended()
 settings = Settings()
+pwd_context = PasswordHash((
+    Argon2Hasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    ),
+))
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+_USER_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+_USER_INIT_FIELDS = {field.name for field in fields(User) if field.init}
 
 
 def get_password_harsh(password: str) -> str:
@@ -27,6 +66,114 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify a password; also rehash it if its costs are outdated."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _timed(func, *args):
+    """Run `func` and report how long it took, from inside the worker."""
+    start = perf_counter()
+    result = func(*args)
+    return result, perf_counter() - start
+
+
+class PasswordHasher:
+    """Run Argon2 work in a worker pool with a bounded backlog.
+
+    Hashing holds a core for tens of milliseconds, so it is kept off the
+    event loop. Once `max_pending` jobs are queued, new ones are refused
+    with 503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, executor: str, workers: int | None, max_pending: int):
+        self.executor = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.executor == 'process':
+                self._pool = ProcessPoolExecutor(self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix='argon2'
+                )
+        return self._pool
+
+    async def run(self, func, *args):
+        operation = OPERATIONS.get(func, func.__name__)
+
+        if self.executor == 'inline':
+            result, seconds = _timed(func, *args)
+            password_hash_duration.observe(seconds, operation)
+            return result
+
+        if self.pending >= self.max_pending:
+            raise_service_unavailable()
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            start = perf_counter()
+            result, seconds = await loop.run_in_executor(
+                self._get_pool(), _timed, func, *args
+            )
+        finally:
+            self.pending -= 1
+
+        password_hash_duration.observe(seconds, operation)
+        password_hash_wait.observe(
+            max(perf_counter() - start - seconds, 0.0), operation
+        )
+        return result
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+OPERATIONS = {
+    get_password_harsh: 'hash',
+    verify_password: 'verify',
+    verify_and_update_password: 'verify',
+}
+
+password_hasher = PasswordHasher(
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password for storing without blocking the event loop."""
+    return await password_hasher.run(get_password_harsh, password)
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> bool:
+    """Verify a password without blocking the event loop."""
+    return await password_hasher.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify and maybe rehash a password without blocking the loop."""
+    return await password_hasher.run(
+        verify_and_update_password, plain_password, hashed_password
+    )
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
 
@@ -44,6 +191,145 @@ def create_access_token(data: dict):
     return encoeded_jwt
 
 
+def access_token_claims(user_id: int, token_version: int) -> dict:
+    return {'sub': str(user_id), 'ver': token_version}
+
+
+def refresh_token_digest(token: str) -> bytes:
+    # Tokens are random, so a fast unsalted hash is enough to keep a
+    # database leak from handing them out
+    return sha256(token.encode()).digest()
+
+
+async def issue_refresh_token(
+    session: AsyncSession, user_id: int, family_id: UUID | None = None
+) -> str:
+    """Store a new refresh token for `user_id` and return its value.
+
+    Without a `family_id` a new login is starting. Either way the user's
+    expired tokens are purged by the same statement.
+    """
+    token = secrets.token_urlsafe(32)
+    statement = (
+        insert(RefreshToken)
+        .values(
+            digest=refresh_token_digest(token),
+            user_id=user_id,
+            family_id=family_id or uuid4(),
+            expires_at=func.now()
+            + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+        .add_cte(
+            delete(RefreshToken)
+            .where(
+                RefreshToken.user_id == user_id,
+                RefreshToken.expires_at <= func.now(),
+            )
+            .cte('purged')
+        )
+    )
+
+    await session.execute(statement)
+    return token
+
+
+def _snapshot_user(user: User) -> dict:
+    """Copy the column values of a loaded user into a plain dict."""
+    return {key: getattr(user, key) for key in _USER_COLUMNS}
+
+
+async def _restore_user(session: AsyncSession, snapshot: dict) -> User:
+    """Rebuild a cached user and attach it to `session` without SQL."""
+    user = User(**{
+        key: value
+        for key, value in snapshot.items()
+        if key in _USER_INIT_FIELDS
+    })
+    for key, value in snapshot.items():
+        if key not in _USER_INIT_FIELDS:
+            setattr(user, key, value)
+
+    make_transient_to_detached(user)
+    return await session.merge(user, load=False)
+
+
+async def _load_user(session: AsyncSession, user_id: int) -> User | None:
+    snapshot = principal_cache.get(user_id)
+    if snapshot is not None:
+        return await _restore_user(session, snapshot)
+
+    user = await session.scalar(select(User).where(User.id == user_id))
+    if user is not None:
+        principal_cache.set(user_id, _snapshot_user(user))
+    return user
+
+
+class PrincipalListener:
+    """Drop cached principals as soon as any worker changes their user.
+
+    A trigger on users sends the user's id on PRINCIPAL_CHANNEL when a
+    transaction changing or deleting it commits. While the listener is
+    disconnected, cached principals only go stale for as long as
+    PRINCIPAL_CACHE_TTL_SECONDS, and the cache is emptied on reconnect.
+    """
+
+    def __init__(self, cache: TTLCache, url: str, retry_seconds=1.0):
+        self.cache = cache
+        self.url = url
+        self.retry_seconds = retry_seconds
+        self._task = None
+
+    async def start(self):
+        """Listen in the background once the first attempt has finished."""
+        attempted = asyncio.Event()
+        self._task = asyncio.create_task(self._run(attempted))
+        await attempted.wait()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, attempted: asyncio.Event):
+        conninfo = (
+            make_url(self.url)
+            .set(drivername='postgresql')
+            .render_as_string(hide_password=False)
+        )
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    conninfo, autocommit=True, connect_timeout=5
+                ) as conn:
+                    await conn.execute(f'LISTEN {PRINCIPAL_CHANNEL}')
+                    # Changes made while nobody listened went unnoticed
+                    self.cache.invalidate_all()
+                    attempted.set()
+                    async for notify in conn.notifies():
+                        self.cache.invalidate(int(notify.payload))
+
+            except psycopg.Error as error:
+                logger.warning(
+                    'Not listening for principal changes: %s', error
+                )
+
+            attempted.set()
+            await asyncio.sleep(self.retry_seconds)
+
+
+principal_listener = PrincipalListener(principal_cache, settings.DATABASE_URL)
+
+
+@registry.add_collector
+def collect_principal_cache_stats():
+    stats = principal_cache.stats()
+    principal_cache_lookups.set('hit', value=stats['hits'])
+    principal_cache_lookups.set('miss', value=stats['misses'])
+    principal_cache_evictions.set(value=stats['evictions'])
+    principal_cache_entries.set(value=stats['size'])
+
+
 async def get_current_user(
     session: AsyncSession = Depends(get_session),
     token: str = Depends(ouath2_scheme),
@@ -52,22 +338,39 @@ async def get_current_user(
         payload = decode(
             token, settings.SECRET_KEY, algorithms=settings.ALGORITHM
         )
-        subject_email = payload.get('sub')
-        if subject_email is None:
+        subject = payload.get('sub')
+        if subject is None:
+            jwt_failures.inc('missing_subject')
             raise_credentials_expection()
 
     except DecodeError:
+        jwt_failures.inc('invalid')
         raise_credentials_expection()
 
     except ExpiredSignatureError:
+        jwt_failures.inc('expired')
         raise_credentials_expection()
 
-    user = await session.scalar(
-        select(User).where(User.email == subject_email)
-    )
+    if 'ver' in payload:
+        try:
+            user_id = int(subject)
+
+        except ValueError:
+            jwt_failures.inc('invalid')
+            raise_credentials_expection()
+
+        user = await _load_user(session, user_id)
+
+    else:
+        # Tokens issued before ids were used name the user by email; they
+        # count as version 0 and lapse on their own within their lifetime
+        user = await session.scalar(select(User).where(User.email == subject))
 
     if user is None:
         raise_credentials_expection()
 
-    else:
-        return user
+    if user.token_version != payload.get('ver', 0):
+        jwt_failures.inc('revoked')
+        raise_credentials_expection()
+
+    return user
@@ -0,0 +1,55 @@
+"""Serializers for responses built from rows the app selected itself.
+
+The TypedDicts mirror the public schemas. Their TypeAdapters are built
+once at import and encode plain dict rows straight to JSON bytes in
+pydantic-core, skipping the validation FastAPI runs on a response_model.
+"""
+
+from typing import TypedDict
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from fast_zero.db_models import ToDo, TodoState, User
+
+# Rows keep the select order, so these follow the public schemas' fields
+TODO_COLUMNS = (ToDo.title, ToDo.description, ToDo.state, ToDo.id)
+USER_COLUMNS = (User.id, User.username, User.email)
+
+
+class TodoRow(TypedDict):
+    title: str
+    description: str | None
+    state: TodoState
+    id: int
+
+
+class UserRow(TypedDict):
+    id: int
+    username: str
+    email: str
+
+
+class TodosPage(TypedDict):
+    todos: list[TodoRow]
+    next_cursor: str | None
+
+
+class UsersPage(TypedDict):
+    users: list[UserRow]
+    next_cursor: str | None
+
+
+todos_page = TypeAdapter(TodosPage)
+users_page = TypeAdapter(UsersPage)
+
+
+def json_response(
+    adapter: TypeAdapter, payload, headers: dict | None = None
+) -> Response:
+    """Encode `payload` with `adapter` into a ready-made JSON response."""
+    return Response(
+        adapter.dump_json(payload),
+        media_type='application/json',
+        headers=headers,
+    )
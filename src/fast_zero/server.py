@@ -0,0 +1,82 @@
+"""Run the API for production: several uvicorn workers on one socket.
+
+Each worker is a fresh process that imports the app and opens its own
+database pools in the app lifespan. On SIGTERM the workers stop taking
+connections, finish in-flight requests for up to SHUTDOWN_GRACE_SECONDS
+and then drain their pools:
+
+    python -m fast_zero.server --host 0.0.0.0 --port 8000 [--workers 4]
+
+Every worker holds up to DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW
+connections, so size the pools so all workers fit in max_connections.
+"""
+
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from fast_zero.settings import Settings
+
+logger = logging.getLogger('fast_zero.server')
+
+
+def available_cores() -> int:
+    """CPUs this process may use, honouring affinity and a cgroup quota."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    # Containers limited with --cpus see every host CPU but get a quota
+    try:
+        with open('/sys/fs/cgroup/cpu.max', encoding='utf-8') as file:
+            quota, period = file.read().split()
+
+    except (OSError, ValueError):
+        return cores
+
+    if quota == 'max':
+        return cores
+    return max(1, min(cores, int(quota) // int(period)))
+
+
+def main():
+    settings = Settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=settings.WEB_CONCURRENCY or available_cores(),
+        help='default: WEB_CONCURRENCY, else the available cores',
+    )
+    args = parser.parse_args()
+
+    # Workers inherit the environment: warm each pool unless configured
+    # there or in .env, which the environment would otherwise override
+    if 'DATABASE_POOL_WARM' not in settings.model_fields_set:
+        os.environ['DATABASE_POOL_WARM'] = str(settings.DATABASE_POOL_SIZE)
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info(
+        'Starting %d workers, up to %d database connections in total',
+        args.workers,
+        args.workers
+        * (settings.DATABASE_POOL_SIZE + settings.DATABASE_MAX_OVERFLOW),
+    )
+    uvicorn.run(
+        'fast_zero.app:app',
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        lifespan='on',
+        timeout_graceful_shutdown=settings.SHUTDOWN_GRACE_SECONDS,
+    )
+
+
+if __name__ == '__main__':
+    main()
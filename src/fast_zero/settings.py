@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,3 +11,80 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # Refresh tokens rotate on every use; each one lives this long
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # Resolved principals kept in memory by get_current_user. Changes are
+    # pushed to every worker; the TTL only matters while that push is down.
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60
+
+    # Fail any relationship lazy load not requested by the query itself
+    RAISE_ON_LAZY_LOAD: bool = False
+
+    # Argon2 costs for new hashes, as picked by `python -m
+    # fast_zero.calibrate`; older hashes are upgraded at the next login
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+
+    # Where Argon2 work runs and how much of it may be queued at once
+    PASSWORD_HASH_EXECUTOR: Literal['thread', 'process', 'inline'] = 'thread'
+    PASSWORD_HASH_WORKERS: int | None = None
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Login attempts allowed per email and per client address in a sliding
+    # window, and password verifications allowed to run at once
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS: float = 60
+    LOGIN_RATE_LIMIT_PER_EMAIL: int = 10
+    LOGIN_RATE_LIMIT_PER_ADDRESS: int = 100
+    LOGIN_MAX_CONCURRENT_VERIFICATIONS: int = 16
+    RATE_LIMIT_BACKEND: str = 'fast_zero.rate_limit:MemoryBackend'
+
+    # Production server (python -m fast_zero.server); workers default to
+    # the cores available to the process
+    WEB_CONCURRENCY: int | None = None
+    SHUTDOWN_GRACE_SECONDS: int = 30
+
+    # Most todos accepted by one POST /todos/batch call
+    TODO_BATCH_MAX_SIZE: int = 500
+
+    # Connection pool of each database engine
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    # Connections each pool opens at startup, and how long shutdown waits
+    # for busy connections to come back before closing them
+    DATABASE_POOL_WARM: int = 0
+    DATABASE_DRAIN_SECONDS: float = 10
+    # psycopg prepares a statement after this many runs; None disables it
+    DATABASE_PREPARE_THRESHOLD: int | None = 5
+
+    # Optional read replica; GET requests use it while it is healthy
+    DATABASE_REPLICA_URL: str | None = None
+    # After committing a write, a client reads from the primary this long
+    REPLICA_READ_YOUR_WRITES_SECONDS: float = 5
+    # How long an unreachable replica is skipped before it is tried again
+    REPLICA_RETRY_SECONDS: float = 30
+
+    # Rows fetched from the server-side cursor per export chunk
+    EXPORT_CHUNK_SIZE: int = 1000
+
+    # Row errors listed in an import result; the rest are only counted
+    IMPORT_MAX_ERRORS: int = 100
+    # Rows sent per COPY during an import; a chunk the database rejects is
+    # rolled back and reported, and the import carries on
+    IMPORT_CHUNK_SIZE: int = 5000
+
+    # Record request, pool and Argon2 metrics for GET /metrics
+    METRICS_ENABLED: bool = True
+
+    # Send per-request SQL totals as X-DB-* response headers, and raise
+    # NPlusOneWarning for repeated statements instead of only logging them
+    DEBUG: bool = False
+    # Statements slower than this are logged as warnings
+    SLOW_QUERY_MS: float = 200
+    # One statement repeated this often in a request is reported as N+1
+    N_PLUS_ONE_THRESHOLD: int = 5
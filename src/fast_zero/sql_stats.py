@@ -0,0 +1,165 @@
+"""Per-request accounting of the SQL statements each request runs.
+
+Engine events time every statement and add it to the RequestQueries of
+the request being served, found through a context variable that the
+middleware sets. At the end of the request the totals are logged, slow
+statements are flagged and a statement repeated many times with only its
+parameters changing is logged, and with DEBUG on raises NPlusOneWarning.
+"""
+
+import logging
+import warnings
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from fast_zero.settings import Settings
+
+logger = logging.getLogger('fast_zero.sql')
+settings = Settings()
+
+
+class NPlusOneWarning(UserWarning):
+    """The same statement ran once per row of an earlier result."""
+
+
+@dataclass
+class RequestQueries:
+    count: int = 0
+    seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str | None = None
+    # Statements are parametrized, so identical text means identical shape
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement] += 1
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [
+            (statement, times)
+            for statement, times in self.shapes.items()
+            if times >= threshold
+        ]
+
+
+current_queries: ContextVar[RequestQueries | None] = ContextVar(
+    'current_queries', default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, *_):
+    # Kept on the execution, so a statement that fails leaves nothing behind
+    if context is not None:
+        context._query_started_at = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, *_):
+    started_at = getattr(context, '_query_started_at', None)
+    if started_at is None:
+        return
+
+    seconds = perf_counter() - started_at
+
+    if seconds * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            'Slow query took %.1f ms: %s',
+            seconds * 1000,
+            statement,
+            extra={'db_seconds': seconds, 'statement': statement},
+        )
+
+    queries = current_queries.get()
+    if queries is not None:
+        queries.record(statement, seconds)
+
+
+def instrument_engine(engine):
+    """Time every statement `engine` runs and attribute it to the request."""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+    return engine
+
+
+def uninstrument_engine(engine):
+    sync_engine = engine.sync_engine
+    event.remove(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.remove(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def report_queries(method: str, path: str, queries: RequestQueries):
+    """Log a request's SQL totals and warn about repeated statements."""
+    logger.debug(
+        '%s %s ran %d statements in %.1f ms',
+        method,
+        path,
+        queries.count,
+        queries.seconds * 1000,
+        extra={
+            'method': method,
+            'path': path,
+            'db_queries': queries.count,
+            'db_seconds': queries.seconds,
+            'db_slowest_seconds': queries.slowest_seconds,
+            'db_slowest_statement': queries.slowest_statement,
+        },
+    )
+
+    for statement, times in queries.repeated(settings.N_PLUS_ONE_THRESHOLD):
+        message = f'{method} {path} ran the same statement {times} times'
+        logger.warning(
+            '%s: %s',
+            message,
+            statement,
+            extra={'path': path, 'statement': statement, 'times': times},
+        )
+        if settings.DEBUG:
+            warnings.warn(message, NPlusOneWarning, stacklevel=2)
+
+
+def debug_headers(queries: RequestQueries) -> dict:
+    return {
+        'X-DB-Queries': str(queries.count),
+        'X-DB-Time-Ms': f'{queries.seconds * 1000:.2f}',
+        'X-DB-Slowest-Ms': f'{queries.slowest_seconds * 1000:.2f}',
+    }
+
+
+class QueryStatsMiddleware:
+    """Collect the statements of each HTTP request and report on them.
+
+    With DEBUG on, the totals so far are also sent as response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = current_queries.set(queries)
+
+        async def send_wrapper(message):
+            if settings.DEBUG and message['type'] == 'http.response.start':
+                MutableHeaders(scope=message).update(debug_headers(queries))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+
+        finally:
+            current_queries.reset(token)
+            report_queries(scope['method'], scope['path'], queries)
@@ -1,5 +1,6 @@
 from contextlib import contextmanager
 from datetime import datetime
+from functools import partial
 
 import factory
 import pytest
@@ -10,9 +11,10 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from testcontainers.postgres import PostgresContainer
 
 from fast_zero.app import app
-from fast_zero.database import get_session
+from fast_zero.database import get_session, raise_on_lazy_load
 from fast_zero.db_models import User, table_registry
-from fast_zero.security import Settings, get_password_harsh
+from fast_zero.rate_limit import login_limiter
+from fast_zero.security import Settings, get_password_harsh, principal_cache
 
 
 @pytest.fixture
@@ -29,7 +31,9 @@ def client(session: AsyncSession):
         yield session
 
     # Setup: Create a new TestClient instance
+    principal_cache.clear()
     with TestClient(app) as client:
+        client.portal.call(login_limiter.reset)
         app.dependency_overrides[get_session] = get_session_override
         yield client
 
@@ -72,7 +76,7 @@ async def session(engine):
         await conn.run_sync(table_registry.metadata.create_all)
 
     async with AsyncSession(engine, expire_on_commit=False) as session:
-        yield session
+        yield raise_on_lazy_load(session)
 
     async with engine.begin() as conn:
         await conn.run_sync(table_registry.metadata.drop_all)
@@ -99,6 +103,25 @@ def mock_db_time():
     return _mock_db_time
 
 
+@contextmanager
+def _count_queries(engine):
+    statements = []
+
+    def record_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', record_statement)
+
+    yield statements
+
+    event.remove(engine.sync_engine, 'before_cursor_execute', record_statement)
+
+
+@pytest.fixture
+def count_queries(engine):
+    return partial(_count_queries, engine)
+
+
 @pytest.fixture
 def token(client, user):
     response = client.post(
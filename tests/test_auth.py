@@ -1,10 +1,28 @@
+import asyncio
+import threading
 from datetime import datetime, timedelta
 from http import HTTPStatus
+from uuid import uuid4
 
+import pytest
+from fastapi import HTTPException
 from freezegun import freeze_time
 from jwt import decode
-
-from fast_zero.security import create_access_token
+from pwdlib.hashers.argon2 import Argon2Hasher
+from sqlalchemy import insert, select, update
+
+from fast_zero.cache import TTLCache
+from fast_zero.db_models import RefreshToken, User
+from fast_zero.security import (
+    PasswordHasher,
+    PrincipalListener,
+    create_access_token,
+    get_password_harsh,
+    principal_cache,
+    pwd_context,
+    refresh_token_digest,
+    verify_password,
+)
 from fast_zero.settings import Settings
 
 ACCESS_TOKEN_EXPIRE_MINUTES = Settings().ACCESS_TOKEN_EXPIRE_MINUTES
@@ -64,6 +82,186 @@ def test_get_token(client, user):
     assert 'access_token' in token
 
 
+def test_token_names_user_by_id_and_version(client, user, settings):
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    payload = decode(
+        response.json()['access_token'],
+        settings.SECRET_KEY,
+        algorithms=settings.ALGORITHM,
+    )
+
+    assert payload['sub'] == str(user.id)
+    assert payload['ver'] == 0
+
+
+def test_legacy_email_token_still_accepted(client, user):
+    token = create_access_token({'sub': user.email})
+
+    response = client.post(
+        '/auth/refresh_token', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_revoke_rejects_every_issued_token(client, user, token):
+    legacy = create_access_token({'sub': user.email})
+    refresh_token = _login(client, user)['refresh_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    response = client.post('/auth/revoke', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    refreshed = client.post(
+        '/auth/refresh', json={'refresh_token': refresh_token}
+    )
+    assert refreshed.status_code == HTTPStatus.UNAUTHORIZED
+    for stale in (token, legacy):
+        rejected = client.post(
+            '/auth/refresh_token',
+            headers={'Authorization': f'Bearer {stale}'},
+        )
+        assert rejected.status_code == HTTPStatus.UNAUTHORIZED
+
+    fresh = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    ).json()['access_token']
+    response = client.post(
+        '/auth/refresh_token', headers={'Authorization': f'Bearer {fresh}'}
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+def _login(client, user):
+    return client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    ).json()
+
+
+def test_refresh_rotates_the_refresh_token(client, user):
+    issued = _login(client, user)
+
+    response = client.post(
+        '/auth/refresh', json={'refresh_token': issued['refresh_token']}
+    )
+    rotated = response.json()
+    replayed = client.post(
+        '/auth/refresh', json={'refresh_token': issued['refresh_token']}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert rotated['refresh_token'] != issued['refresh_token']
+    assert replayed.status_code == HTTPStatus.UNAUTHORIZED
+    protected = client.post(
+        '/auth/refresh_token',
+        headers={'Authorization': f'Bearer {rotated["access_token"]}'},
+    )
+    assert protected.status_code == HTTPStatus.OK
+
+
+def test_refresh_token_reuse_revokes_its_family(client, user):
+    stolen = _login(client, user)['refresh_token']
+    other_session = _login(client, user)['refresh_token']
+    current = client.post(
+        '/auth/refresh', json={'refresh_token': stolen}
+    ).json()['refresh_token']
+
+    client.post('/auth/refresh', json={'refresh_token': stolen})
+    response = client.post('/auth/refresh', json={'refresh_token': current})
+    untouched = client.post(
+        '/auth/refresh', json={'refresh_token': other_session}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert untouched.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_expired_refresh_token_rejected(session, client, user):
+    refresh_token = _login(client, user)['refresh_token']
+    await session.execute(
+        update(RefreshToken).values(
+            expires_at=datetime.now() - timedelta(minutes=1)
+        )
+    )
+    await session.commit()
+
+    response = client.post(
+        '/auth/refresh', json={'refresh_token': refresh_token}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_rotation_purges_expired_refresh_tokens(session, client, user):
+    current = _login(client, user)['refresh_token']
+    await session.execute(
+        insert(RefreshToken).values(
+            digest=refresh_token_digest('expired'),
+            user_id=user.id,
+            family_id=uuid4(),
+            expires_at=datetime.now() - timedelta(minutes=1),
+        )
+    )
+    await session.commit()
+
+    response = client.post('/auth/refresh', json={'refresh_token': current})
+    remaining = await session.scalars(
+        select(RefreshToken.digest).where(RefreshToken.user_id == user.id)
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert refresh_token_digest('expired') not in remaining.all()
+
+
+def test_refresh_with_unknown_token(client):
+    response = client.post('/auth/refresh', json={'refresh_token': 'nope'})
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_password(session, client, user):
+    weak = Argon2Hasher(time_cost=1, memory_cost=8192, parallelism=1)
+    user.password = weak.hash(user.clean_password)
+    await session.commit()
+    outdated = user.password
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+    await session.refresh(user)
+
+    assert response.status_code == HTTPStatus.OK
+    assert user.password != outdated
+    assert not pwd_context.current_hasher.check_needs_rehash(user.password)
+    assert verify_password(user.clean_password, user.password)
+
+
+@pytest.mark.asyncio
+async def test_login_keeps_current_password_hash(session, client, user):
+    current = user.password
+
+    _login(client, user)
+    client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': 'wrong_password'},
+    )
+    await session.refresh(user)
+
+    assert user.password == current
+
+
 def test_get_token_wrong_password(client, user):
     response = client.post(
         '/auth/token',
@@ -154,3 +352,166 @@ def test_token_expired_dont_refresh(client, user):
 
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    cache.get('a')
+    cache.set('c', 'C')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    assert cache.get('c') == 'C'
+    assert cache.stats() == {
+        'size': 2,
+        'maxsize': 2,
+        'hits': 3,
+        'misses': 1,
+        'evictions': 1,
+    }
+
+
+def test_ttl_cache_expires_entries():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set('a', 'A')
+
+    now[0] = 9.9
+    assert cache.get('a') == 'A'
+
+    now[0] = 10.0
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_current_user_served_from_cache(client, token, count_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    with count_queries() as statements:
+        response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert statements == []
+    assert principal_cache.stats()['hits'] == 1
+
+
+def test_update_user_invalidates_cached_principal(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'renamed',
+            'email': 'renamed@test.com',
+            'password': user.clean_password,
+        },
+    )
+    assert len(principal_cache) == 0
+
+    # Tokens name the user by id, so a new email keeps them valid
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_password_change_revokes_every_session(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    refresh_token = _login(client, user)['refresh_token']
+
+    response = client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': user.username,
+            'email': user.email,
+            'password': 'new_password',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    protected = client.post('/auth/refresh_token', headers=headers)
+    assert protected.status_code == HTTPStatus.UNAUTHORIZED
+    refreshed = client.post(
+        '/auth/refresh', json={'refresh_token': refresh_token}
+    )
+    assert refreshed.status_code == HTTPStatus.UNAUTHORIZED
+    login = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': 'new_password'},
+    )
+    assert login.status_code == HTTPStatus.OK
+
+
+def test_delete_user_invalidates_cached_principal(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    client.delete(f'/users/{user.id}', headers=headers)
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_principal_listener_drops_users_changed_elsewhere(
+    engine, session, user, other_user
+):
+    cache = TTLCache(maxsize=10, ttl=60)
+    listener = PrincipalListener(
+        cache, engine.url.render_as_string(hide_password=False)
+    )
+    await listener.start()
+    cache.set(user.id, 'cached')
+    cache.set(other_user.id, 'cached')
+
+    # A todo write only bumps change_version, which is not announced
+    await session.execute(
+        update(User)
+        .where(User.id == user.id)
+        .values(change_version=User.change_version + 1)
+    )
+    await session.execute(
+        update(User)
+        .where(User.id == other_user.id)
+        .values(email='changed@test.com')
+    )
+    await session.commit()
+
+    async with asyncio.timeout(5):
+        while len(cache) == 2:  # noqa: PLR2004
+            await asyncio.sleep(0.01)
+    await listener.stop()
+
+    assert cache.get(user.id) == 'cached'
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_runs_in_pool():
+    hasher = PasswordHasher(executor='thread', workers=1, max_pending=4)
+
+    hashed = await hasher.run(get_password_harsh, 'secret')
+
+    assert await hasher.run(verify_password, 'secret', hashed)
+    assert not await hasher.run(verify_password, 'wrong', hashed)
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_backlog_is_full():
+    hasher = PasswordHasher(executor='thread', workers=1, max_pending=1)
+    release = threading.Event()
+    blocked = asyncio.create_task(hasher.run(release.wait))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hasher.run(get_password_harsh, 'secret')
+
+    release.set()
+    await blocked
+    hasher.shutdown()
+    assert exc_info.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
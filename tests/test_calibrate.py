@@ -0,0 +1,32 @@
+from fast_zero.calibrate import MIN_MEMORY_COST, calibrate
+
+
+def _cost_model(time_cost, memory_cost, parallelism):
+    # Seconds grow with passes over memory, as they roughly do for Argon2
+    return time_cost * memory_cost / 1024 * 0.001
+
+
+def test_calibrate_raises_passes_up_to_the_target():
+    result = calibrate(0.2, 4, 64 * 1024, measure=_cost_model)
+
+    assert result['time_cost'] == 3  # noqa: PLR2004
+    assert result['memory_cost'] == 64 * 1024
+    assert result['seconds'] <= 0.2  # noqa: PLR2004
+
+
+def test_calibrate_lowers_memory_when_one_pass_is_too_slow():
+    result = calibrate(0.05, 4, 256 * 1024, measure=_cost_model)
+
+    assert result['time_cost'] == 1
+    assert result['memory_cost'] == 32 * 1024
+
+
+def test_calibrate_keeps_the_memory_floor():
+    result = calibrate(0.001, 4, 64 * 1024, measure=_cost_model)
+
+    assert result == {
+        'time_cost': 1,
+        'memory_cost': MIN_MEMORY_COST,
+        'parallelism': 4,
+        'seconds': _cost_model(1, MIN_MEMORY_COST, 4),
+    }
@@ -0,0 +1,78 @@
+"""Exports of many todos.
+
+The default row count keeps the suite fast; set EXPORT_TEST_ROWS (e.g. to
+1000000) to check memory stays flat at production sizes.
+"""
+
+import json
+import os
+import tracemalloc
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from fast_zero.db_models import ToDo
+from fast_zero.export import stream_todos
+from fast_zero.routers import todos
+
+EXPORTED_TODOS = int(os.environ.get('EXPORT_TEST_ROWS', '50000'))
+CHUNK_SIZE = 1000
+MAX_PEAK_BYTES = 4 * 1024 * 1024
+
+
+@pytest_asyncio.fixture
+async def many_todos(session, user):
+    await session.execute(
+        text(
+            'INSERT INTO todos (title, description, user_id, state) '
+            "SELECT 'title ' || g, 'description ' || g, :user_id, 'todo' "
+            'FROM generate_series(1, :todos) AS g'
+        ),
+        {'user_id': user.id, 'todos': EXPORTED_TODOS},
+    )
+    await session.commit()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('export_format', ['ndjson', 'csv'])
+async def test_export_memory_is_bounded(
+    session, user, many_todos, export_format
+):
+    exported_rows = 0
+    tracemalloc.start()
+
+    try:
+        chunks = stream_todos(
+            session, [ToDo.user_id == user.id], export_format, CHUNK_SIZE
+        )
+        async for chunk in chunks:
+            exported_rows += chunk.count(b'\n')
+
+        _, peak = tracemalloc.get_traced_memory()
+
+    finally:
+        tracemalloc.stop()
+
+    # CSV adds a header line
+    assert exported_rows - (export_format == 'csv') == EXPORTED_TODOS
+    assert peak < MAX_PEAK_BYTES
+
+
+@pytest.mark.asyncio
+async def test_export_endpoint_streams_every_row(
+    client, token, many_todos, monkeypatch
+):
+    monkeypatch.setattr(todos.settings, 'EXPORT_CHUNK_SIZE', CHUNK_SIZE)
+    ids = []
+
+    with client.stream(
+        'GET', '/todos/export', headers={'Authorization': f'Bearer {token}'}
+    ) as response:
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        ids.extend(json.loads(line)['id'] for line in response.iter_lines())
+
+    assert len(ids) == EXPORTED_TODOS
+    assert ids == sorted(ids)
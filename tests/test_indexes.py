@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+
+SEEDED_USERS = 200
+SEEDED_TODOS = 50_000
+
+
+@pytest_asyncio.fixture
+async def seeded_todos(session, user):
+    """Spread a realistic number of todos over many users."""
+    await session.execute(
+        text(
+            'INSERT INTO users (username, email, password) '
+            "SELECT 'seed' || g, 'seed' || g || '@test.com', 'x' "
+            'FROM generate_series(1, :users) AS g'
+        ),
+        {'users': SEEDED_USERS},
+    )
+    await session.execute(
+        text(
+            'INSERT INTO todos (title, description, user_id, state) '
+            "SELECT 'title ' || g, 'description', "
+            '(SELECT min(id) FROM users) + g % (:users + 1), '
+            "(ARRAY['draft', 'todo', 'doing', 'done', 'trash'])"
+            '[g % 5 + 1]::todostate '
+            'FROM generate_series(1, :todos) AS g'
+        ),
+        {'users': SEEDED_USERS, 'todos': SEEDED_TODOS},
+    )
+    await session.commit()
+
+    async with session.bind.connect() as conn:
+        await conn.execute(text('ANALYZE users, todos'))
+
+
+@contextmanager
+def _capture_todos_select(engine):
+    captured = []
+
+    def record(conn, cursor, statement, parameters, *args):
+        if statement.startswith('SELECT') and 'FROM todos' in statement:
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', record)
+
+    yield captured
+
+    event.remove(engine.sync_engine, 'before_cursor_execute', record)
+
+
+async def _explain(session, statement, parameters):
+    result = await session.connection()
+    plan = await result.exec_driver_sql(f'EXPLAIN {statement}', parameters)
+    return '\n'.join(row[0] for row in plan)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ('query_string', 'expected_index'),
+    [
+        ('limit=10', 'ix_todos_user_id_id'),
+        ('limit=10&cursor=WzEwMF0', 'ix_todos_user_id_id'),
+        ('state=doing&limit=10', 'ix_todos_user_id_state_id'),
+    ],
+)
+async def test_list_todos_uses_index(  # noqa: PLR0913, PLR0917
+    session, client, engine, token, seeded_todos, query_string, expected_index
+):
+    with _capture_todos_select(engine) as captured:
+        client.get(
+            f'/todos/?{query_string}',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    plan = await _explain(session, *captured[-1])
+
+    assert expected_index in plan
@@ -0,0 +1,78 @@
+from http import HTTPStatus
+
+import pytest
+
+from fast_zero.metrics import Histogram, Registry
+
+
+def _sample(text: str, series: str) -> float:
+    for line in text.splitlines():
+        name, _, value = line.rpartition(' ')
+        if name == series:
+            return float(value)
+    return 0.0
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(
+        Histogram('work_seconds', 'Work.', ('kind',), buckets=(0.1, 1.0))
+    )
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, 'a')
+    text = registry.render()
+
+    assert '# TYPE work_seconds histogram' in text
+    buckets = [
+        _sample(text, f'work_seconds_bucket{{kind="a",le="{le}"}}')
+        for le in ('0.1', '1.0', '+Inf')
+    ]
+    assert buckets == [2, 3, 4]
+    assert _sample(text, 'work_seconds_sum{kind="a"}') == pytest.approx(3.65)
+
+
+def test_metrics_counts_requests_by_route_template(client, user, token):
+    labels = 'method="GET",route="/users/{user_id}"'
+    series = f'http_requests_total{{{labels},status="200"}}'
+    before = _sample(client.get('/metrics').text, series)
+
+    client.get(f'/users/{user.id}')
+    client.get(f'/users/{user.id}')
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert _sample(response.text, series) == before + 2
+    in_progress = f'http_requests_in_progress{{{labels}}}'
+    assert _sample(response.text, in_progress) == 0
+
+
+def test_metrics_records_argon2_and_jwt_failures(client, user):
+    before = client.get('/metrics').text
+
+    client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+    client.get('/todos/', headers={'Authorization': 'Bearer not-a-token'})
+    after = client.get('/metrics').text
+
+    verify = 'password_hash_duration_seconds_count{operation="verify"}'
+    invalid = 'jwt_decode_failures_total{reason="invalid"}'
+    assert _sample(after, verify) == _sample(before, verify) + 1
+    assert _sample(after, invalid) == _sample(before, invalid) + 1
+    assert 'db_pool_connections{engine="primary",state="checked_out"}' in after
+
+
+def test_metrics_exports_principal_cache_stats(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+    client.post('/auth/refresh_token', headers=headers)
+
+    text = client.get('/metrics').text
+
+    assert _sample(text, 'principal_cache_lookups_total{result="hit"}') == 1
+    assert _sample(text, 'principal_cache_lookups_total{result="miss"}') == 1
+    assert _sample(text, 'principal_cache_entries') == 1
+    assert 'principal_cache_evictions_total 0' in text
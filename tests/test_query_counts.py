@@ -0,0 +1,258 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+
+from fast_zero.db_models import User
+from tests.test_todo import ToDoFactory
+
+
+@pytest.mark.asyncio
+async def test_unexpected_lazy_load_raises(session, user):
+    session.expunge_all()
+    db_user = await session.scalar(select(User).where(User.id == user.id))
+
+    with pytest.raises(InvalidRequestError):
+        _ = db_user.todos
+
+
+@pytest.mark.asyncio
+async def test_list_todos_query_count(
+    session, client, user, token, count_queries
+):
+    session.add_all(ToDoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.get(
+            '/todos/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    # principal lookup + change version + todos page, no relationship loads
+    expected_queries = 3
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+@pytest.mark.asyncio
+async def test_list_todos_not_modified_skips_the_page_query(
+    session, client, user, token, count_queries
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['ETag']
+
+    with count_queries() as statements:
+        response = client.get(
+            '/todos/', headers={**headers, 'If-None-Match': etag}
+        )
+
+    # the principal comes from the cache; only the version is read
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_read_users_query_count(
+    session, client, other_user, token, count_queries
+):
+    session.add_all(ToDoFactory.create_batch(5, user_id=other_user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.get(
+            '/users/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    # principal lookup + users page, no todos loaded
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+def test_read_single_user_query_count(client, user, count_queries):
+    with count_queries() as statements:
+        response = client.get(f'/users/{user.id}')
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == 1
+
+
+def test_login_query_count(client, user, count_queries):
+    with count_queries() as statements:
+        response = client.post(
+            '/auth/token',
+            data={'username': user.email, 'password': user.clean_password},
+        )
+
+    # user lookup + refresh token insert
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+def test_refresh_query_count(client, user, count_queries):
+    refresh_token = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    ).json()['refresh_token']
+
+    with count_queries() as statements:
+        response = client.post(
+            '/auth/refresh', json={'refresh_token': refresh_token}
+        )
+
+    # claim the old token with its owner + insert the new one, no Argon2
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+@pytest.mark.asyncio
+async def test_delete_user_query_count(
+    session, client, user, token, count_queries
+):
+    session.add_all(ToDoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+    session.expunge_all()
+
+    with count_queries() as statements:
+        response = client.delete(
+            f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    # principal lookup + DELETE; the database cascades to the todos
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_batch_query_count(
+    session, client, user, token, count_queries
+):
+    session.add_all(ToDoFactory.create_batch(50, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.patch(
+            '/todos/batch',
+            json={'filters': {}, 'changes': {'state': 'done'}},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    # principal lookup + one UPDATE ... RETURNING
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_batch_query_count(
+    session, client, user, token, count_queries
+):
+    session.add_all(ToDoFactory.create_batch(50, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.request(
+            'DELETE',
+            '/todos/batch',
+            json={'filters': {}},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    # principal lookup + one DELETE ... RETURNING
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+def test_create_todo_query_count(client, token, count_queries):
+    with count_queries() as statements:
+        response = client.post(
+            '/todos/',
+            json={'title': 'One trip', 'description': 'insert returning'},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    # principal lookup + INSERT ... RETURNING, no refresh
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+@pytest.mark.asyncio
+async def test_patch_todo_query_count(
+    session, client, user, token, count_queries
+):
+    todo = ToDoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.patch(
+            f'/todos/{todo.id}',
+            json={'state': 'done'},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    # principal lookup + UPDATE ... RETURNING, no SELECT or refresh
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['state'] == 'done'
+    assert len(statements) == expected_queries
+
+
+@pytest.mark.asyncio
+async def test_delete_todo_query_count(
+    session, client, user, token, count_queries
+):
+    todo = ToDoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.delete(
+            f'/todos/{todo.id}', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    # principal lookup + DELETE ... RETURNING
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == expected_queries
+
+
+def test_create_user_query_count(client, count_queries):
+    with count_queries() as statements:
+        response = client.post(
+            '/users/',
+            json={
+                'username': 'counted',
+                'email': 'counted@test.com',
+                'password': 'secret',
+            },
+        )
+
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING, nothing else
+    assert response.status_code == HTTPStatus.CREATED
+    assert len(statements) == 1
+
+
+def test_update_user_query_count(client, user, token, count_queries):
+    with count_queries() as statements:
+        response = client.put(
+            f'/users/{user.id}',
+            json={
+                'username': 'recounted',
+                'email': 'recounted@test.com',
+                'password': 'secret',
+            },
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    # principal lookup + UPDATE ... RETURNING, no refresh
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['username'] == 'recounted'
+    assert len(statements) == expected_queries
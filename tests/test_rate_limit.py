@@ -0,0 +1,116 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+
+from fast_zero import security
+from fast_zero.rate_limit import MemoryBackend, RateLimitBackend, login_limiter
+
+
+def _login(client, email, password='any_password'):
+    return client.post(
+        '/auth/token', data={'username': email, 'password': password}
+    )
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_slides_its_window():
+    now = [0.0]
+    backend = MemoryBackend(clock=lambda: now[0])
+
+    assert await backend.hit('k', 2, 10) is None
+    now[0] = 4.0
+    assert await backend.hit('k', 2, 10) is None
+    assert await backend.hit('k', 2, 10) == 6.0  # noqa: PLR2004
+
+    now[0] = 10.0
+    assert await backend.hit('k', 2, 10) is None
+    assert await backend.hit('k', 2, 10) == 4.0  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_forgets_least_recent_keys():
+    backend = MemoryBackend(max_keys=2)
+    await backend.hit('a', 1, 60)
+    await backend.hit('b', 1, 60)
+    await backend.hit('a', 1, 60)
+    await backend.hit('c', 1, 60)
+
+    assert await backend.hit('b', 1, 60) is None
+    assert await backend.hit('a', 1, 60) is None
+
+
+def test_backend_must_implement_hit_and_reset():
+    class Incomplete(RateLimitBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_login_limited_per_email_before_hashing(client, user, monkeypatch):
+    monkeypatch.setattr(login_limiter, 'per_email', 2)
+    verifications = []
+    verify = security.verify_and_update_password_async
+
+    async def counting_verify(*args):
+        verifications.append(args)
+        return await verify(*args)
+
+    monkeypatch.setattr(
+        'fast_zero.routers.auth.verify_and_update_password_async',
+        counting_verify,
+    )
+
+    _login(client, user.email, 'wrong')
+    # Case variants share the email's window
+    _login(client, user.email.upper(), 'wrong')
+    response = _login(client, user.email)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert 0 < int(response.headers['Retry-After']) <= login_limiter.window
+    assert len(verifications) == 1
+
+
+def test_login_limited_per_address(client, user, other_user, monkeypatch):
+    monkeypatch.setattr(login_limiter, 'per_address', 2)
+
+    _login(client, 'nobody@test.com')
+    _login(client, user.email)
+    response = _login(client, other_user.email)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+
+def test_login_refused_when_verifications_are_saturated(
+    client, user, monkeypatch
+):
+    monkeypatch.setattr(login_limiter, 'verifying', 0)
+    monkeypatch.setattr(login_limiter, 'max_concurrent', 0)
+
+    response = _login(client, user.email)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.headers['Retry-After'] == '1'
+
+
+@pytest.mark.asyncio
+async def test_verification_slots_are_released(monkeypatch):
+    monkeypatch.setattr(login_limiter, 'max_concurrent', 1)
+    release = asyncio.Event()
+
+    async def verify():
+        async with login_limiter.verification():
+            await release.wait()
+
+    running = asyncio.create_task(verify())
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException):
+        async with login_limiter.verification():
+            pass
+
+    release.set()
+    await running
+    assert login_limiter.verifying == 0
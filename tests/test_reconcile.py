@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import delete, select, update
+
+from fast_zero.db_models import ToDo, ToDoCount, TodoState
+from fast_zero.reconcile import reconcile
+
+
+def _todo(title, state, user_id):
+    return ToDo(title=title, description='', user_id=user_id, state=state)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_repairs_drifted_counts(session, user, other_user):
+    session.add_all([
+        _todo('a', TodoState.todo, user.id),
+        _todo('b', TodoState.todo, user.id),
+        _todo('c', TodoState.done, user.id),
+        _todo('d', TodoState.done, other_user.id),
+    ])
+    await session.commit()
+    await session.execute(
+        update(ToDoCount)
+        .where(ToDoCount.user_id == user.id, ToDoCount.state == TodoState.todo)
+        .values(count=7)
+    )
+    await session.execute(
+        delete(ToDoCount).where(ToDoCount.state == TodoState.done)
+    )
+    await session.commit()
+
+    repairs = await reconcile(session)
+
+    assert repairs == {
+        user.id: {
+            TodoState.todo: {'stored': 7, 'actual': 2},
+            TodoState.done: {'stored': 0, 'actual': 1},
+        },
+        other_user.id: {TodoState.done: {'stored': 0, 'actual': 1}},
+    }
+    counts = await session.execute(
+        select(ToDoCount.user_id, ToDoCount.state, ToDoCount.count)
+    )
+    assert sorted(counts.all()) == [
+        (user.id, TodoState.done, 1),
+        (user.id, TodoState.todo, 2),
+        (other_user.id, TodoState.done, 1),
+    ]
+    assert await reconcile(session) == {}
+
+
+@pytest.mark.asyncio
+async def test_counts_go_with_their_user(session, user):
+    session.add(_todo('a', TodoState.todo, user.id))
+    await session.commit()
+
+    await session.delete(user)
+    await session.commit()
+
+    assert (await session.scalars(select(ToDoCount))).all() == []
@@ -0,0 +1,43 @@
+import pytest
+
+from fast_zero.db_models import TodoState
+from fast_zero.schemas import TodosList, UsersList
+from fast_zero.serialization import (
+    TODO_COLUMNS,
+    USER_COLUMNS,
+    todos_page,
+    users_page,
+)
+
+
+def _row(columns, *values):
+    return {column.key: value for column, value in zip(columns, values)}
+
+
+@pytest.mark.parametrize(
+    ('adapter', 'model', 'payload'),
+    [
+        (
+            todos_page,
+            TodosList,
+            {
+                'todos': [
+                    _row(TODO_COLUMNS, 'title', None, TodoState.doing, 1)
+                ],
+                'next_cursor': 'WzFd',
+            },
+        ),
+        (
+            users_page,
+            UsersList,
+            {
+                'users': [_row(USER_COLUMNS, 1, 'a', 'a@b.com')],
+                'next_cursor': None,
+            },
+        ),
+    ],
+)
+def test_fast_serializers_match_response_models(adapter, model, payload):
+    expected = model.model_validate(payload).model_dump_json()
+
+    assert adapter.dump_json(payload).decode() == expected
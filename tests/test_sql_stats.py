@@ -0,0 +1,107 @@
+import logging
+import warnings
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+
+from fast_zero import sql_stats
+from fast_zero.db_models import User
+from fast_zero.sql_stats import (
+    NPlusOneWarning,
+    RequestQueries,
+    current_queries,
+    instrument_engine,
+    report_queries,
+    uninstrument_engine,
+)
+
+
+@pytest.fixture
+def instrumented(engine):
+    instrument_engine(engine)
+    yield engine
+    uninstrument_engine(engine)
+
+
+def test_debug_headers_report_request_queries(
+    client, token, instrumented, monkeypatch
+):
+    monkeypatch.setattr(sql_stats.settings, 'DEBUG', True)
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    # principal lookup + change version + todos page
+    expected_queries = '3'
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['X-DB-Queries'] == expected_queries
+    assert float(response.headers['X-DB-Time-Ms']) >= float(
+        response.headers['X-DB-Slowest-Ms']
+    )
+
+
+def test_no_debug_headers_by_default(client, instrumented):
+    response = client.get('/users/1')
+
+    assert 'X-DB-Queries' not in response.headers
+
+
+async def _repeat_statement(session, user) -> RequestQueries:
+    queries = RequestQueries()
+    token = current_queries.set(queries)
+    for _ in range(sql_stats.settings.N_PLUS_ONE_THRESHOLD):
+        await session.scalar(select(User.id).where(User.id == user.id))
+    current_queries.reset(token)
+    return queries
+
+
+@pytest.mark.asyncio
+async def test_repeated_statement_warns_n_plus_one_in_debug(
+    session, user, instrumented, monkeypatch
+):
+    monkeypatch.setattr(sql_stats.settings, 'DEBUG', True)
+    queries = await _repeat_statement(session, user)
+
+    with pytest.warns(NPlusOneWarning, match='same statement 5 times'):
+        report_queries('GET', '/users/', queries)
+
+
+@pytest.mark.asyncio
+async def test_repeated_statement_is_only_logged_by_default(
+    session, user, instrumented, caplog
+):
+    queries = await _repeat_statement(session, user)
+
+    with (
+        warnings.catch_warnings(),
+        caplog.at_level(logging.WARNING, logger='fast_zero.sql'),
+    ):
+        warnings.simplefilter('error', NPlusOneWarning)
+        report_queries('GET', '/users/', queries)
+
+    assert 'same statement 5 times' in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_leaves_no_timing_behind(session, instrumented):
+    with pytest.raises(DBAPIError):
+        await session.execute(text('SELECT 1/0'))
+    await session.rollback()
+
+    connection = await session.connection()
+    assert 'query_started_at' not in connection.info
+
+
+@pytest.mark.asyncio
+async def test_slow_query_is_logged(
+    session, instrumented, monkeypatch, caplog
+):
+    monkeypatch.setattr(sql_stats.settings, 'SLOW_QUERY_MS', 0)
+
+    with caplog.at_level(logging.WARNING, logger='fast_zero.sql'):
+        await session.scalar(select(User.id))
+
+    assert 'Slow query' in caplog.text
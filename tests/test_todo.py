@@ -1,6 +1,13 @@
+import csv
+import io
+import json
+
 import factory
 import factory.fuzzy
 import pytest
+from sqlalchemy import text
+
+from fast_zero import importer
 from fast_zero.db_models import ToDo, TodoState
 from http import HTTPStatus
 
@@ -300,3 +307,494 @@ async def test_patch_todo(client, session, user, token):
     assert response.json()['description'] == todo_description
     assert response.json()['state'] == todo_state
 
+
+@pytest.mark.asyncio
+async def test_list_todos_cursor_walks_every_todo_once(
+    session, client, user, token):
+    total_todos = 7
+    page_size = 3
+    session.add_all(ToDoFactory.create_batch(total_todos, user_id=user.id))
+    await session.commit()
+
+    seen_ids = []
+    cursor = None
+    while True:
+        endpoint = f'/todos/?limit={page_size}'
+        if cursor:
+            endpoint += f'&cursor={cursor}'
+        page = client.get(
+            endpoint, headers={'Authorization': f'Bearer {token}'}
+        ).json()
+        seen_ids += [todo['id'] for todo in page['todos']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen_ids == sorted(seen_ids)
+    assert len(set(seen_ids)) == total_todos
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_ranks_title_matches_first(
+    session, client, user, token):
+    description_match = ToDoFactory(
+        user_id=user.id, title='Groceries', description='buy milk')
+    title_match = ToDoFactory(
+        user_id=user.id, title='Milk delivery', description='tomorrow')
+    session.add_all([
+        description_match,
+        title_match,
+        ToDoFactory(user_id=user.id, title='Unrelated', description='none'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/?search=milk',
+        headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['id'] for todo in response.json()['todos']] == [
+        title_match.id, description_match.id]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_with_state_and_cursor(
+    session, client, user, token):
+    matching_todos = 5
+    session.add_all(ToDoFactory.create_batch(
+        matching_todos, user_id=user.id, title='Report draft',
+        state=TodoState.doing))
+    session.add_all(ToDoFactory.create_batch(
+        3, user_id=user.id, title='Report draft', state=TodoState.done))
+    await session.commit()
+
+    headers = {'Authorization': f'Bearer {token}'}
+    first_page = client.get(
+        '/todos/?search=report&state=doing&limit=3', headers=headers).json()
+    second_page = client.get(
+        '/todos/?search=report&state=doing&limit=3'
+        f'&cursor={first_page["next_cursor"]}',
+        headers=headers).json()
+
+    ids = [todo['id'] for todo in first_page['todos'] + second_page['todos']]
+    assert len(set(ids)) == matching_todos
+    assert second_page['next_cursor'] is None
+    assert {todo['state'] for todo in second_page['todos']} == {'doing'}
+
+
+def test_create_todos_batch(client, token, count_queries):
+    todos = [
+        {'title': f'Batch {n}', 'description': 'bulk', 'state': 'todo'}
+        for n in range(50)
+    ]
+
+    with count_queries() as statements:
+        response = client.post(
+            '/todos/batch',
+            json=todos,
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    # principal lookup + a single multi-row INSERT ... RETURNING
+    expected_queries = 2
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['title'] for todo in response.json()] == [
+        todo['title'] for todo in todos]
+    assert len(statements) == expected_queries
+
+
+def test_create_todos_without_description(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    single = client.post('/todos/', json={'title': 'Bare'}, headers=headers)
+    batch = client.post(
+        '/todos/batch',
+        json=[{'title': 'Bare batch'}, {'title': 'Null', 'description': None}],
+        headers=headers,
+    )
+
+    assert single.status_code == HTTPStatus.OK
+    assert batch.status_code == HTTPStatus.OK
+    created = [single.json(), *batch.json()]
+    assert [todo['description'] for todo in created] == ['', '', '']
+
+
+def test_create_todos_batch_is_all_or_nothing(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todos = [
+        {'title': 'Valid', 'description': 'bulk'},
+        {'title': 'Invalid', 'description': 'bulk', 'state': 'unknown'},
+    ]
+
+    response = client.post('/todos/batch', json=todos, headers=headers)
+    listed = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert listed.json()['todos'] == []
+
+
+def test_create_todos_batch_over_size_cap(client, token, settings):
+    todos = [{'title': 'Too many', 'description': 'bulk'}] * (
+        settings.TODO_BATCH_MAX_SIZE + 1)
+
+    response = client.post(
+        '/todos/batch',
+        json=todos,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_batch_by_ids(
+    session, client, user, other_user, token):
+    todos = ToDoFactory.create_batch(3, user_id=user.id, state=TodoState.todo)
+    foreign_todo = ToDoFactory(user_id=other_user.id, state=TodoState.todo)
+    session.add_all([*todos, foreign_todo])
+    await session.commit()
+    ids = [todos[0].id, todos[1].id, foreign_todo.id]
+
+    response = client.patch(
+        '/todos/batch',
+        json={'ids': ids, 'changes': {'state': 'done'}},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'ids': [todos[0].id, todos[1].id], 'count': 2}
+    await session.refresh(foreign_todo)
+    assert foreign_todo.state == TodoState.todo
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_batch_by_filters(session, client, user, token):
+    drafts = 4
+    session.add_all(ToDoFactory.create_batch(
+        drafts, user_id=user.id, state=TodoState.draft))
+    session.add_all(ToDoFactory.create_batch(
+        2, user_id=user.id, state=TodoState.doing))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.patch(
+        '/todos/batch',
+        json={'filters': {'state': 'draft'}, 'changes': {'state': 'trash'}},
+        headers=headers,
+    )
+    trashed = client.get('/todos/?state=trash', headers=headers)
+
+    assert response.json()['count'] == drafts
+    assert len(trashed.json()['todos']) == drafts
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_batch(session, client, user, token):
+    todos = ToDoFactory.create_batch(3, user_id=user.id, state=TodoState.done)
+    session.add_all(todos)
+    session.add(ToDoFactory(user_id=user.id, state=TodoState.doing))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.request(
+        'DELETE',
+        '/todos/batch',
+        json={'filters': {'state': 'done'}},
+        headers=headers,
+    )
+    remaining = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert sorted(response.json()['ids']) == [todo.id for todo in todos]
+    assert [todo['state'] for todo in remaining.json()['todos']] == ['doing']
+
+
+def test_todos_batch_requires_a_selection(client, token):
+    response = client.patch(
+        '/todos/batch',
+        json={'changes': {'state': 'done'}},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_export_todos_ndjson(session, client, user, other_user, token):
+    todos = ToDoFactory.create_batch(3, user_id=user.id)
+    session.add_all(todos)
+    session.add(ToDoFactory(user_id=other_user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export', headers={'Authorization': f'Bearer {token}'}
+    )
+    rows = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert [row['id'] for row in rows] == [todo.id for todo in todos]
+    assert rows[0]['title'] == todos[0].title
+    assert rows[0]['state'] == todos[0].state.value
+
+
+@pytest.mark.asyncio
+async def test_export_todos_csv_applies_filters(session, client, user, token):
+    session.add_all(ToDoFactory.create_batch(2, user_id=user.id, state='done'))
+    session.add(ToDoFactory(user_id=user.id, state='draft'))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?format=csv&state=done',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    header, *rows = csv.reader(io.StringIO(response.text))
+
+    assert response.headers['content-type'].startswith('text/csv')
+    assert header == [
+        'id', 'title', 'description', 'state', 'created_at', 'updated_at'
+    ]
+    assert [row[3] for row in rows] == ['done', 'done']
+
+
+@pytest.mark.asyncio
+async def test_export_todos_arrow(session, client, user, token):
+    ipc = pytest.importorskip('pyarrow.ipc')
+    session.add_all(ToDoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?format=arrow',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    table = ipc.open_stream(response.content).read_all()
+
+    assert table.num_rows == 3  # noqa: PLR2004
+    assert table.column_names[:4] == ['id', 'title', 'description', 'state']
+
+
+def test_import_todos_ndjson_reports_bad_lines(client, token):
+    body = '\n'.join([
+        '{"title": "first", "description": "a", "state": "doing"}',
+        '{"title": "second", "state": "someday"}',
+        '',
+        '{"description": "no title"}',
+        'not json',
+        '{"title": "last"}',
+    ])
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/todos/import', content=body, headers=headers)
+    todos = client.get('/todos/', headers=headers).json()['todos']
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['imported'] == 2  # noqa: PLR2004
+    assert response.json()['failed'] == 3  # noqa: PLR2004
+    assert [error['line'] for error in response.json()['errors']] == [2, 4, 5]
+    assert response.json()['errors'][0]['errors'][0].startswith('state:')
+    assert [(todo['title'], todo['state']) for todo in todos] == [
+        ('first', 'doing'),
+        ('last', 'todo'),
+    ]
+
+
+def test_import_todos_csv(client, token):
+    body = (
+        'title,description,state\n'
+        'first,"spans\ntwo lines",done\n'
+        'second,,\n'
+        ',missing title,draft\n'
+    )
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post(
+        '/todos/import?format=csv', content=body, headers=headers
+    )
+    todos = client.get('/todos/', headers=headers).json()['todos']
+
+    assert response.json()['imported'] == 2  # noqa: PLR2004
+    assert response.json()['errors'] == [
+        {'line': 5, 'errors': ['title: Field required']}
+    ]
+    assert todos[0]['description'] == 'spans\ntwo lines'
+    assert todos[1]['state'] == 'todo'
+
+
+def test_import_todos_rejects_nul_characters(client, token):
+    body = '\n'.join([
+        '{"title": "first"}',
+        '{"title": "nul \\u0000 inside"}',
+        '{"title": "last", "description": "\\u0000"}',
+    ])
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/todos/import', content=body, headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['imported'] == 1
+    assert [error['line'] for error in response.json()['errors']] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_import_todos_reports_chunks_the_database_rejects(
+    session, client, token, monkeypatch
+):
+    await session.execute(
+        text("ALTER TABLE todos ADD CONSTRAINT no_bad CHECK (title <> 'bad')")
+    )
+    await session.commit()
+    monkeypatch.setattr(importer.settings, 'IMPORT_CHUNK_SIZE', 2)
+    body = '\n'.join(
+        f'{{"title": "{title}"}}' for title in ['a', 'b', 'bad', 'c', 'd']
+    )
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/todos/import', content=body, headers=headers)
+    todos = client.get('/todos/', headers=headers).json()['todos']
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['imported'] == 3  # noqa: PLR2004
+    assert response.json()['failed'] == 2  # noqa: PLR2004
+    assert response.json()['errors'][0]['line'] == 3  # noqa: PLR2004
+    assert [todo['title'] for todo in todos] == ['a', 'b', 'd']
+
+
+def test_import_todos_csv_requires_a_title_column(client, token):
+    response = client.post(
+        '/todos/import?format=csv',
+        content='name,state\nfirst,done\n',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_list_todos_not_modified(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    first = client.get('/todos/', headers=headers)
+
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': first.headers['ETag']}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b''
+    assert response.headers['ETag'] == first.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+
+def test_list_todos_etag_follows_writes_and_query(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    before = client.get('/todos/', headers=headers).headers['ETag']
+    filtered = client.get('/todos/?state=done', headers=headers)
+
+    client.post(
+        '/todos/', headers=headers, json={'title': 'new', 'description': ''}
+    )
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': before}
+    )
+
+    assert filtered.headers['ETag'] != before
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != before
+
+
+@pytest.mark.asyncio
+async def test_todo_statements_bump_change_version_once(
+    session, client, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    client.post(
+        '/todos/batch',
+        headers=headers,
+        json=[
+            {'title': 'aaa', 'description': ''},
+            {'title': 'bbb', 'description': ''},
+        ],
+    )
+    client.patch(
+        '/todos/batch',
+        headers=headers,
+        json={'filters': {'title': 'aaa'}, 'changes': {'state': 'done'}},
+    )
+    client.post('/todos/import', headers=headers, content='{"title": "c"}')
+    await session.refresh(user)
+
+    assert user.change_version == 3  # noqa: PLR2004
+
+
+def test_todo_stats_empty(client, token):
+    response = client.get(
+        '/todos/stats', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'counts': {state.value: 0 for state in TodoState},
+        'total': 0,
+    }
+
+
+def test_todo_stats_follow_every_write(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    created = client.post(
+        '/todos/batch',
+        headers=headers,
+        json=[
+            {'title': 'aaa', 'description': '', 'state': 'todo'},
+            {'title': 'bbb', 'description': '', 'state': 'todo'},
+            {'title': 'ccc', 'description': '', 'state': 'draft'},
+        ],
+    ).json()
+    client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 'ddd', 'description': '', 'state': 'doing'},
+    )
+    client.patch(
+        f'/todos/{created[0]["id"]}', headers=headers, json={'state': 'done'}
+    )
+    client.patch(
+        '/todos/batch',
+        headers=headers,
+        json={'filters': {'state': 'draft'}, 'changes': {'state': 'trash'}},
+    )
+    client.delete(f'/todos/{created[1]["id"]}', headers=headers)
+    client.post(
+        '/todos/import',
+        headers=headers,
+        content='{"title": "e", "state": "done"}\n{"title": "f"}',
+    )
+    stale = client.get('/todos/stats', headers=headers).headers['ETag']
+    client.request(
+        'DELETE',
+        '/todos/batch',
+        json={'filters': {'state': 'trash'}},
+        headers=headers,
+    )
+
+    response = client.get(
+        '/todos/stats', headers={**headers, 'If-None-Match': stale}
+    )
+    cached = client.get(
+        '/todos/stats',
+        headers={**headers, 'If-None-Match': response.headers['ETag']},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'counts': {
+            'draft': 0,
+            'todo': 1,
+            'doing': 1,
+            'done': 2,
+            'trash': 0,
+        },
+        'total': 4,
+    }
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
@@ -4,6 +4,7 @@ from http import HTTPStatus
 import pytest
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from fast_zero.db_models import User
 from fast_zero.schemas import UserPublic
@@ -16,7 +17,39 @@ def test_read_users(user, client, token):
     )
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
+
+
+def test_read_users_with_cursor(client, user, other_user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first_page = client.get('/users/?limit=1', headers=headers).json()
+    second_page = client.get(
+        f'/users/?limit=1&cursor={first_page["next_cursor"]}',
+        headers=headers,
+    ).json()
+
+    assert [u['id'] for u in first_page['users']] == [user.id]
+    assert [u['id'] for u in second_page['users']] == [other_user.id]
+    assert second_page['next_cursor'] is None
+
+
+def test_read_users_limit_above_maximum(client, token):
+    response = client.get(
+        '/users/?limit=10000000', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_read_users_invalid_cursor(client, token):
+    response = client.get(
+        '/users/?cursor=not-a-cursor',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid pagination cursor'}
 
 
 @pytest.mark.asyncio
@@ -32,7 +65,9 @@ async def test_create_user(session: AsyncSession, mock_db_time):
         await session.commit()
 
         user = await session.scalar(
-            select(User).where(User.username == 'test')
+            select(User)
+            .where(User.username == 'test')
+            .options(selectinload(User.todos))
         )
 
         assert asdict(user) == {
@@ -41,6 +76,8 @@ async def test_create_user(session: AsyncSession, mock_db_time):
             'email': email,
             'created_at': time,
             'updated_at': time,
+            'change_version': 0,
+            'token_version': 0,
             'password': password,
             'todos': []
         }
@@ -141,3 +178,54 @@ def test_read_user_when_id_not_found(client):
     # Assert
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert response.json() == {'detail': 'User not found'}
+
+
+@pytest.mark.parametrize(
+    'duplicate',
+    [
+        {'username': 'taken', 'email': 'other@test.com'},
+        {'username': 'other', 'email': 'taken@test.com'},
+    ],
+)
+def test_create_user_conflict(client, duplicate):
+    client.post(
+        '/users/',
+        json={
+            'username': 'taken',
+            'email': 'taken@test.com',
+            'password': 'password',
+        },
+    )
+
+    response = client.post(
+        '/users/', json={**duplicate, 'password': 'password'}
+    )
+
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert response.json() == {
+        'detail': 'Username or email already registered'
+    }
+
+
+def test_read_user_not_modified_until_updated(client, user, token):
+    etag = client.get(f'/users/{user.id}').headers['ETag']
+    cached = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    client.put(
+        f'/users/{user.id}',
+        json={
+            'username': 'renamed',
+            'email': user.email,
+            'password': 'new_password',
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    response = client.get(
+        f'/users/{user.id}', headers={'If-None-Match': etag}
+    )
+
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+    assert cached.headers['Cache-Control'] == 'no-cache'
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['username'] == 'renamed'
+    assert response.headers['ETag'] != etag